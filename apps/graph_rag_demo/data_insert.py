@@ -1,78 +1,113 @@
+import hashlib
+import json
 import os
+from collections import defaultdict
 
 from dotenv import load_dotenv
+from graph_cache import bump_graph_version, close_client, get_client, subgraph_cache
 from nodes_relationships import links, nodes
-from pymongo import MongoClient
+from pymongo import UpdateOne
+
+# Number of node documents written per bulk_write call
+BATCH_SIZE = 1000
+
+
+def node_key(node):
+    return f"{node.id}:{node.type}"
 
 
 def build_lookup_map():
-    quick_lookup = {}
-    for key in links.keys():
-        relationship = links[key]
-        source_node = relationship.source
-        lookup_key = str(source_node.id) + ":" + str(source_node.type)
-        lookup_content = quick_lookup.get(lookup_key, "empty")
-        if lookup_content != "empty":
-            quick_lookup.get(lookup_key).append(relationship)
-        else:
-            quick_lookup[lookup_key] = [relationship]
+    quick_lookup = defaultdict(list)
+    for relationship in links.values():
+        quick_lookup[node_key(relationship.source)].append(relationship)
     return quick_lookup
 
 
+def content_hash(doc):
+    # Hash everything but the _id so unchanged nodes can be skipped on re-ingestion
+    content = {k: v for k, v in doc.items() if k != "_id"}
+    return hashlib.sha256(json.dumps(content, sort_keys=True).encode()).hexdigest()
+
+
 def create_mongo_documents():
-    mongo_documents = []
     quick_lookup = build_lookup_map()
-    for key in nodes.keys():
-        node = nodes[key]
-        id = str(node.id) + ":" + str(node.type)
-        type = node.type
-        rel = quick_lookup.get(id, None)
+    for node in nodes.values():
+        id = node_key(node)
         relationships = set()
-        targets = {}
-        if rel is not None:
-            for relationship in rel:
-                target_id = (
-                    str(relationship.target.id) + ":" + str(relationship.target.type)
-                )
-                relationships.add(target_id)
-                target_type = targets.get(target_id, None)
-                if target_type is not None:
-                    targets[target_id].append(relationship.type)
-                else:
-                    targets[target_id] = [relationship.type]
-            mongo_documents.append(
-                {
-                    "_id": id,
-                    "type": type,
-                    "relationships": list(relationships),
-                    "targets": targets,
-                }
-            )
-        else:
-            mongo_documents.append(
-                {"_id": id, "type": type, "relationships": [], "targets": {}}
+        targets = defaultdict(list)
+        for relationship in quick_lookup.get(id, []):
+            target_id = node_key(relationship.target)
+            relationships.add(target_id)
+            targets[target_id].append(relationship.type)
+        doc = {
+            "_id": id,
+            "type": node.type,
+            # Sorted so that the content hash is stable across runs
+            "relationships": sorted(relationships),
+            "targets": dict(targets),
+        }
+        doc["content_hash"] = content_hash(doc)
+        yield doc
+
+
+def write_batch(client, collection, batch):
+    # Only upsert nodes that are new or whose content changed since the last run
+    existing = {
+        doc["_id"]: doc.get("content_hash")
+        for doc in collection.find(
+            {"_id": {"$in": [doc["_id"] for doc in batch]}}, {"content_hash": 1}
+        )
+    }
+    changed = [doc for doc in batch if existing.get(doc["_id"]) != doc["content_hash"]]
+    changed_ids = [doc["_id"] for doc in changed]
+    if changed:
+        try:
+            collection.bulk_write(
+                [
+                    UpdateOne({"_id": doc["_id"]}, {"$set": doc}, upsert=True)
+                    for doc in changed
+                ],
+                ordered=False,
             )
-    return mongo_documents
+        finally:
+            # Some writes may have been applied even if the bulk write failed, so let
+            # cached subgraphs in this and other processes know they are stale either way
+            subgraph_cache.invalidate(changed_ids)
+            bump_graph_version(client)
+    return changed_ids
 
 
 def mongo_insert():
-    mongo_documents = create_mongo_documents()
+    changed_ids = []
     try:
         uri = os.getenv("ATLAS_CONNECTION_STRING")
         print(uri)
-        client = MongoClient(uri, appname="devrel.showcase.graph_rag_app")
+        client = get_client()
         database = client["langchain_db"]
         collection = database["nodes_relationships"]
-        for doc in mongo_documents:
-            collection.insert_one(doc)
+        # $graphLookup matches connectFromField values against connectToField (_id, which is
+        # always indexed); the relationships index serves lookups in the reverse direction
+        collection.create_index("relationships")
+        batch = []
+        total = 0
+        for doc in create_mongo_documents():
+            batch.append(doc)
+            if len(batch) == BATCH_SIZE:
+                changed_ids.extend(write_batch(client, collection, batch))
+                total += len(batch)
+                batch = []
+        if batch:
+            changed_ids.extend(write_batch(client, collection, batch))
+            total += len(batch)
+        print(f"{len(changed_ids)} of {total} nodes were new or changed")
     except Exception as e:
         print(e)
-    finally:
-        client.close()
+    return changed_ids
 
 
 if __name__ == "__main__":
     load_dotenv()
     print("Inserting Documents")
     mongo_insert()
+    close_client()
     print("Successfully Inserted Documents")
@@ -1,60 +1,70 @@
-def depth_first_search(graph, start, relationship_names, path):
-    visited = []
-    stack = []
-    parent = []
+import sys
+from collections import deque
+
+
+def node_labels(node_id):
+    # Node ids look like "name:type"; split once per node instead of once per use
+    parts = node_id.split(":")
+    return parts[0], parts[0] + " from " + parts[1]
+
+
+def traverse(
+    graph, start, relationship_names, path, order="dfs", max_nodes=None, verbose=True
+):
+    """
+    Walk the graph from start and describe every edge used to reach a new node.
+
+    order is "dfs" (depth first, the default) or "bfs" (breadth first). If max_nodes is
+    set, the traversal stops after visiting that many nodes. Returns the path string
+    followed by the nodes and links used to render the graph.
+    """
+    if order not in ("dfs", "bfs"):
+        raise ValueError(f"Unknown traversal order {order}, expected 'dfs' or 'bfs'")
+    start = sys.intern(start)
+    visited = {start}
+    labels = {}
     nodes = []
     links = []
-    stack.append(start)
-    visited.append(start)
-    i = 0
-    while stack:
-        s = stack.pop()
-        print(s, end=" ")
-        node = {
-            "id": s,
-            "group": 0,
-            "level": 1,
-            "label": s.split(":")[0] + " from " + s.split(":")[1],
-        }
-        nodes.append(node)
-        if i != 0:
-            parent_node = parent[-1]
-            parent_name = ""
-            current_child_count = 0
-            for x, y in parent_node.items():
-                parent_name = x
-                current_child_count = y
-            relationships = relationship_names[(parent_name, s)]
-            # print(f'{relationships}')
-            rel_names = ""
-            j = 0
+    path_parts = [path]
+    # Each entry is (node, parent it was reached from)
+    frontier = deque([(start, None)])
+    pop = frontier.pop if order == "dfs" else frontier.popleft
+    while frontier:
+        if max_nodes is not None and len(nodes) >= max_nodes:
+            break
+        s, parent_name = pop()
+        if verbose:
+            print(s, end=" ")
+        if s not in labels:
+            labels[s] = node_labels(s)
+        name, label = labels[s]
+        nodes.append({"id": s, "group": 0, "level": 1, "label": label})
+        if parent_name is not None:
+            relationships = relationship_names.get((parent_name, s))
             if relationships:
-                for rel in relationships:
-                    if j != len(relationships) - 1:
-                        rel_names += rel + " / "
-                    else:
-                        rel_names += rel
-                    j += 1
-                path += f'{parent_name.split(":")[0]} ({rel_names}) {s.split(":")[0]}, '
-                link = {
-                    "source": parent_name,
-                    "target": s,
-                    "strength": 0.7,
-                    "linkName": rel_names,
-                }
-                links.append(link)
-            current_child_count -= 1
-            if current_child_count == 0:
-                parent.pop()
-            else:
-                parent[-1][parent_name] = current_child_count
-        k = 0
-        for x in graph[s][::-1]:
+                rel_names = " / ".join(relationships)
+                path_parts.append(f"{labels[parent_name][0]} ({rel_names}) {name}, ")
+                links.append(
+                    {
+                        "source": parent_name,
+                        "target": s,
+                        "strength": 0.7,
+                        "linkName": rel_names,
+                    }
+                )
+        neighbours = graph.get(s, ())
+        # Push neighbours in reverse for DFS so the first neighbour is visited first
+        for x in reversed(neighbours) if order == "dfs" else neighbours:
             if x not in visited:
-                visited.append(x)
-                stack.append(x)
-                k += 1
-        if k > 0:
-            parent.append({s: k})
-        i += 1
-    return path, nodes, links
+                x = sys.intern(x)
+                visited.add(x)
+                frontier.append((x, s))
+    return "".join(path_parts), nodes, links
+
+
+def depth_first_search(graph, start, relationship_names, path, max_nodes=None):
+    return traverse(graph, start, relationship_names, path, "dfs", max_nodes)
+
+
+def breadth_first_search(graph, start, relationship_names, path, max_nodes=None):
+    return traverse(graph, start, relationship_names, path, "bfs", max_nodes)
@@ -1,17 +1,21 @@
-import os
 from pprint import pprint
 
 from dotenv import load_dotenv
-from pymongo import MongoClient
+from graph_cache import get_client, subgraph_cache
 
 load_dotenv()
 
 
 def graph_lookup(node_name, max_depth):
+    # The returned documents are shared with the cache and should not be modified
     graph_lookup_docs = []
     try:
-        uri = os.getenv("ATLAS_CONNECTION_STRING")
-        client = MongoClient(uri, appname="devrel.showcase.apps.graph_rag_demo")
+        client = get_client()
+        subgraph_cache.check_version(client)
+        cached_docs = subgraph_cache.get(node_name, max_depth)
+        if cached_docs is not None:
+            pprint(cached_docs)
+            return cached_docs
         database = client["langchain_db"]
         collection = database["nodes_relationships"]
         pipeline = [
@@ -32,9 +36,8 @@ def graph_lookup(node_name, max_depth):
         cursor = collection.aggregate(pipeline)
         for doc in cursor:
             graph_lookup_docs.append(doc)
+        subgraph_cache.put(node_name, max_depth, graph_lookup_docs)
     except Exception as e:
         print(e)
-    finally:
-        client.close()
     pprint(graph_lookup_docs)
     return graph_lookup_docs
@@ -6,25 +6,11 @@ from depth_first_search import depth_first_search
 from do_graphlookup import graph_lookup
 from dotenv import load_dotenv
 from find_relevant_chunks import find_chunks
-from nodes_relationships import links, nodes
+from graph_cache import close_client
 from openai import OpenAI
 
-if __name__ == "__main__":
-    load_dotenv()
-    open_ai_key = os.getenv("OPENAI_API_KEY1")
-    print(f"----OpenAI Key in Driver Code is {open_ai_key}")
-    openai_client = OpenAI(api_key=open_ai_key)
-    #    print("Inserting documents")
-    #    mongo_insert()
-    #    print("Documents inserted successfully... Adding Embeddings")
-    #    subprocess.run(["powershell","-Command","fnm env --use-on-cd | Out-String | Invoke-Expression\nnode addEmbeddings.js\n"])
-    #    print("Embeddings created successfully... Adding tags")
-    #    subprocess.run(["powershell","-Command","fnm env --use-on-cd | Out-String | Invoke-Expression\nnode addTags.js\n"])
-    #    print("Tags added successfully")
-    question = input("Please enter your question ")
-    tree_depth = input(
-        "What is the maximum tree depth you require for Knowledge graph traversal? "
-    )
+
+def answer_question(openai_client, question, tree_depth):
     tag_docs = find_chunks(question)
     top_id_idx = 0
     top_tag_score = 0
@@ -79,3 +65,28 @@ if __name__ == "__main__":
     )
     print("-----------")
     print(response.choices[0].message.content)
+
+
+if __name__ == "__main__":
+    load_dotenv()
+    open_ai_key = os.getenv("OPENAI_API_KEY1")
+    print(f"----OpenAI Key in Driver Code is {open_ai_key}")
+    openai_client = OpenAI(api_key=open_ai_key)
+    #    print("Inserting documents")
+    #    mongo_insert()
+    #    print("Documents inserted successfully... Adding Embeddings")
+    #    subprocess.run(["powershell","-Command","fnm env --use-on-cd | Out-String | Invoke-Expression\nnode addEmbeddings.js\n"])
+    #    print("Embeddings created successfully... Adding tags")
+    #    subprocess.run(["powershell","-Command","fnm env --use-on-cd | Out-String | Invoke-Expression\nnode addTags.js\n"])
+    #    print("Tags added successfully")
+    # Keep asking questions in the same process so the pooled MongoDB client and the
+    # subgraph cache are reused across questions
+    while True:
+        question = input("Please enter your question (leave empty to exit) ")
+        if not question:
+            break
+        tree_depth = input(
+            "What is the maximum tree depth you require for Knowledge graph traversal? "
+        )
+        answer_question(openai_client, question, tree_depth)
+    close_client()
@@ -1,8 +1,8 @@
 import os
 
 from dotenv import load_dotenv
+from graph_cache import get_client
 from openai import OpenAI
-from pymongo import MongoClient
 
 load_dotenv()
 open_ai_key = os.getenv("OPENAI_API_KEY1")
@@ -57,8 +57,7 @@ def find_chunks(question):
     tag_docs = []
 
     try:
-        uri = os.getenv("ATLAS_CONNECTION_STRING")
-        client = MongoClient(uri)
+        client = get_client()
         database = client["langchain_db"]
         collection = database["knowledge_graph"]
         cursor = collection.aggregate(agg_pipeline)
@@ -66,6 +65,4 @@ def find_chunks(question):
             tag_docs.append(tag)
     except Exception as e:
         print(e)
-    finally:
-        client.close()
     return tag_docs
@@ -0,0 +1,116 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from pymongo import MongoClient
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    # One pooled client per process, so repeated questions reuse open connections
+    # instead of paying for a new handshake every time
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = MongoClient(
+                os.getenv("ATLAS_CONNECTION_STRING"),
+                appname="devrel.showcase.apps.graph_rag_demo",
+                maxPoolSize=int(os.getenv("MONGO_MAX_POOL_SIZE", "20")),
+            )
+        return _client
+
+
+def close_client():
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+            _client = None
+
+
+def get_graph_version(client):
+    # data_insert bumps this counter whenever it rewrites nodes, so caches in other
+    # processes can tell that their subgraphs are stale
+    doc = client["langchain_db"]["graph_metadata"].find_one(
+        {"_id": "nodes_relationships"}
+    )
+    return doc["version"] if doc else 0
+
+
+def bump_graph_version(client):
+    client["langchain_db"]["graph_metadata"].update_one(
+        {"_id": "nodes_relationships"}, {"$inc": {"version": 1}}, upsert=True
+    )
+
+
+class SubgraphCache:
+    """
+    LRU cache of $graphLookup results keyed by (node, max_depth), with a time to live.
+
+    Entries are also dropped when any node they contain is invalidated, or when the graph
+    version stored in MongoDB changes. The version is re-read at most once every
+    version_check_seconds.
+    """
+
+    def __init__(self, max_entries=256, ttl_seconds=600, version_check_seconds=5):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.version_check_seconds = version_check_seconds
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.version = None
+        self.version_checked_at = 0
+        self.hits = 0
+        self.misses = 0
+
+    def check_version(self, client):
+        now = time.monotonic()
+        if now - self.version_checked_at < self.version_check_seconds:
+            return
+        version = get_graph_version(client)
+        with self.lock:
+            if version != self.version:
+                self.entries.clear()
+                self.version = version
+            self.version_checked_at = now
+
+    def get(self, node_name, max_depth):
+        key = (node_name, max_depth)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or time.monotonic() - entry[0] > self.ttl_seconds:
+                self.entries.pop(key, None)
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[2]
+
+    def put(self, node_name, max_depth, docs):
+        node_ids = {node_name}
+        for doc in docs:
+            node_ids.update(rel_doc["_id"] for rel_doc in doc.get("relates_to", []))
+        with self.lock:
+            self.entries[(node_name, max_depth)] = (time.monotonic(), node_ids, docs)
+            self.entries.move_to_end((node_name, max_depth))
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def invalidate(self, node_ids=None):
+        # Drop every subgraph that contains one of node_ids, or everything if not given
+        with self.lock:
+            if node_ids is None:
+                self.entries.clear()
+                return
+            node_ids = set(node_ids)
+            for key in [k for k, v in self.entries.items() if v[1] & node_ids]:
+                del self.entries[key]
+
+
+subgraph_cache = SubgraphCache(
+    max_entries=int(os.getenv("GRAPH_CACHE_SIZE", "256")),
+    ttl_seconds=float(os.getenv("GRAPH_CACHE_TTL_SECONDS", "600")),
+)
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Vector Search Recall Benchmark
+Measures recall and latency of Atlas Vector Search for different numCandidates
+multipliers, against exact top-k results computed with NumPy cosine similarity.
+
+Query vectors are embeddings of frames sampled from the collection, optionally with
+Gaussian noise added. Ground truth is computed over every frame in the searched set, so
+the whole set (all frames, or those of --video-id) is loaded into memory.
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from services.mongodb_service import mongodb_service
+
+
+async def load_frames(video_id=None, max_frames=100000):
+    """Load frame keys and L2-normalized embeddings of the searched set"""
+    query = {"embedding": {"$exists": True}}
+    if video_id:
+        query["video_id"] = video_id
+
+    frame_count = await mongodb_service.frame_collection.count_documents(query)
+    if frame_count > max_frames:
+        raise ValueError(
+            f"{frame_count} frames to compare against, more than --max-frames {max_frames}. "
+            "Narrow the search with --video-id or raise the limit"
+        )
+
+    docs = await mongodb_service.frame_collection.find(
+        query, {"_id": 0, "video_id": 1, "frame_number": 1, "embedding": 1}
+    ).to_list()
+    keys = [(doc["video_id"], doc["frame_number"]) for doc in docs]
+    embeddings = np.asarray([doc["embedding"] for doc in docs], dtype=np.float32)
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    return keys, embeddings / np.where(norms == 0, 1, norms)
+
+
+def exact_top_k(embeddings, query, k):
+    """Indices of the k rows most cosine-similar to query, best first"""
+    scores = embeddings @ (query / np.linalg.norm(query))
+    k = min(k, len(scores))
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top])]
+
+
+async def run_setting(queries, truths, top_k, video_id, exact, multiplier):
+    recalls = []
+    latencies = []
+    for query, truth in zip(queries, truths):
+        start = time.perf_counter()
+        results = await mongodb_service.semantic_search(
+            query.tolist(),
+            top_k,
+            video_filter=video_id,
+            exact=exact,
+            num_candidates_multiplier=multiplier,
+        )
+        latencies.append((time.perf_counter() - start) * 1000)
+        found = {(result["video_id"], result["frame_number"]) for result in results}
+        recalls.append(len(found & truth) / len(truth))
+    return {
+        "mode": "exact" if exact else "ann",
+        "num_candidates": None if exact else min(10000, top_k * multiplier),
+        "recall": float(np.mean(recalls)),
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p95_ms": float(np.percentile(latencies, 95)),
+    }
+
+
+async def benchmark(args):
+    await mongodb_service.connect()
+    try:
+        keys, embeddings = await load_frames(args.video_id, args.max_frames)
+        if len(keys) <= args.top_k:
+            print(f"❌ Need more than {args.top_k} frames with embeddings")
+            return False
+        print(f"✅ Loaded {len(keys)} frames")
+
+        rng = np.random.default_rng(args.seed)
+        sample = rng.choice(len(keys), size=min(args.queries, len(keys)), replace=False)
+        queries = embeddings[sample]
+        if args.noise:
+            queries = queries + rng.normal(0, args.noise, queries.shape).astype(
+                np.float32
+            )
+        truths = [
+            {keys[i] for i in exact_top_k(embeddings, query, args.top_k)}
+            for query in queries
+        ]
+
+        settings = [(False, multiplier) for multiplier in args.multipliers]
+        if not args.skip_exact:
+            settings.append((True, None))
+
+        rows = []
+        for exact, multiplier in settings:
+            # Warm up caches and connections before timing
+            await run_setting(
+                queries[:1], truths[:1], args.top_k, args.video_id, exact, multiplier
+            )
+            rows.append(
+                await run_setting(
+                    queries, truths, args.top_k, args.video_id, exact, multiplier
+                )
+            )
+
+        print(f"\nrecall@{args.top_k} over {len(queries)} queries")
+        print(
+            f"{'mode':<6} {'numCandidates':>13} {'recall':>7} {'p50 ms':>8} {'p95 ms':>8}"
+        )
+        for row in rows:
+            print(
+                f"{row['mode']:<6} {row['num_candidates'] or '-':>13} "
+                f"{row['recall']:>7.3f} {row['p50_ms']:>8.1f} {row['p95_ms']:>8.1f}"
+            )
+
+        if args.output:
+            with open(args.output, "w") as f:
+                json.dump(
+                    {
+                        "frames": len(keys),
+                        "queries": len(queries),
+                        "top_k": args.top_k,
+                        "video_id": args.video_id,
+                        "noise": args.noise,
+                        "results": rows,
+                    },
+                    f,
+                    indent=2,
+                )
+            print(f"\n📄 Results written to {args.output}")
+        return True
+    finally:
+        await mongodb_service.disconnect()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--queries", type=int, default=100, help="Number of queries")
+    parser.add_argument("--top-k", type=int, default=10, help="Results per query")
+    parser.add_argument(
+        "--multipliers",
+        type=int,
+        nargs="+",
+        default=[2, 5, 10, 15, 20],
+        help="numCandidates multipliers of top-k to compare",
+    )
+    parser.add_argument("--video-id", help="Search the frames of a single video")
+    parser.add_argument(
+        "--noise",
+        type=float,
+        default=0.0,
+        help="Standard deviation of Gaussian noise added to query vectors",
+    )
+    parser.add_argument(
+        "--max-frames",
+        type=int,
+        default=100000,
+        help="Refuse to load more frames than this",
+    )
+    parser.add_argument("--skip-exact", action="store_true", help="Skip exact search")
+    parser.add_argument("--seed", type=int, default=0, help="Query sampling seed")
+    parser.add_argument("--output", help="Write results to this JSON file")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    success = asyncio.run(benchmark(parse_args()))
+    sys.exit(0 if success else 1)
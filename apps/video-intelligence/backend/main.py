@@ -1,11 +1,15 @@
+import asyncio
+import json
 import logging
 import os
 import time
 import uuid
+import weakref
 from contextlib import asynccontextmanager
 from pathlib import Path
-from typing import Dict
+from typing import Dict, Optional
 
+import aiofiles
 from dotenv import load_dotenv
 from fastapi import (
     FastAPI,
@@ -18,22 +22,45 @@ from fastapi import (
 )
 from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi.responses import JSONResponse, Response
 from fastapi.staticfiles import StaticFiles
 from models.schemas import (
+    ChunkedUploadRequest,
+    ChunkedUploadStatus,
     SearchQuery,
     SearchResponse,
     SearchResult,
+    SearchSegment,
+    SegmentSearchQuery,
+    SegmentSearchResponse,
     UploadResponse,
     VideoMetadata,
 )
 from services.ai_service import ai_service
+from services.deletion import RetentionSweeper, VideoDeleter
+from services.description_cache import description_cache
+from services.job_queue import JobQueue, JobWorkerPool, ProgressBroker
+from services.metrics import (
+    SEARCH_SECONDS,
+    SEARCH_STAGE_SECONDS,
+    render_metrics,
+    timed,
+)
 from services.mongodb_service import mongodb_service
+from services.search_cache import (
+    invalidate_video_results,
+    normalize_query,
+    query_embedding_cache,
+    search_result_cache,
+)
 from services.video_processor import video_processor
 
 # Load environment variables
 load_dotenv()
 
+# Uploads are written to disk in chunks of this size rather than read into memory
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -43,8 +70,25 @@ logger = logging.getLogger(__name__)
 async def lifespan(app: FastAPI):
     """Manage application lifespan events"""
     # Startup
+    worker_pool = JobWorkerPool(
+        job_queue,
+        run_processing_job,
+        concurrency=int(os.getenv("PROCESSING_CONCURRENCY", "2")),
+        poll_interval=float(os.getenv("JOB_POLL_INTERVAL_SECONDS", "5")),
+    )
+    deletion_pool = JobWorkerPool(
+        deletion_queue,
+        video_deleter.run_job,
+        concurrency=int(os.getenv("DELETION_CONCURRENCY", "1")),
+        poll_interval=float(os.getenv("JOB_POLL_INTERVAL_SECONDS", "5")),
+    )
     try:
         await mongodb_service.connect()
+        await job_queue.ensure_indexes()
+        await deletion_queue.ensure_indexes()
+        worker_pool.start()
+        deletion_pool.start()
+        retention_sweeper.start()
         logger.info("Application startup completed")
     except Exception as e:
         logger.warning(f"MongoDB connection failed during startup: {e}")
@@ -56,7 +100,11 @@ async def lifespan(app: FastAPI):
 
     # Shutdown
     try:
+        await retention_sweeper.stop()
+        await worker_pool.stop()
+        await deletion_pool.stop()
         await mongodb_service.disconnect()
+        video_processor.shutdown()
         logger.info("Application shutdown completed")
     except Exception as e:
         logger.warning(f"Shutdown warning: {e}")
@@ -89,6 +137,34 @@ async def validation_exception_handler(request: Request, exc: RequestValidationE
         return JSONResponse(status_code=422, content={"detail": exc.errors()})
 
 
+# Room for the multipart boundaries and part headers sent around an uploaded file
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+
+# Added before CORS so that rejections still carry CORS headers
+@app.middleware("http")
+async def reject_oversized_uploads(request: Request, call_next):
+    """Reject uploads whose Content-Length is over the size limit without reading them.
+
+    The upload form is parsed, spooling the whole file, before the upload handler runs,
+    so the handler can only check the size of what was already received.
+    """
+    if request.method == "POST" and request.url.path == "/upload":
+        content_length = request.headers.get("content-length", "")
+        max_size_mb, max_size_bytes = get_max_upload_size()
+        if (
+            content_length.isdigit()
+            and int(content_length) > max_size_bytes + MULTIPART_OVERHEAD_BYTES
+        ):
+            return JSONResponse(
+                status_code=413,
+                content={
+                    "detail": f"File too large ({int(content_length) / (1024*1024):.1f}MB). Maximum size: {max_size_mb}MB"
+                },
+            )
+    return await call_next(request)
+
+
 # CORS configuration
 app.add_middleware(
     CORSMiddleware,
@@ -98,10 +174,39 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Serve static files (frames and thumbnails)
+
+class CachedStaticFiles(StaticFiles):
+    """StaticFiles whose responses may be cached by browsers for `max_age` seconds.
+
+    StaticFiles already sends ETag and Last-Modified headers and answers conditional
+    requests with 304 Not Modified.
+    """
+
+    def __init__(self, *args, max_age: int = 0, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.cache_control = f"public, max-age={max_age}"
+        if max_age > 0:
+            # Frame files are never rewritten under the same name
+            self.cache_control += ", immutable"
+
+    def file_response(self, *args, **kwargs):
+        response = super().file_response(*args, **kwargs)
+        response.headers["Cache-Control"] = self.cache_control
+        return response
+
+
+# Serve static files (frames and thumbnails). Frame requests are answered here rather
+# than by a route handler
 frames_dir = Path(os.getenv("FRAMES_DIR", "frames"))
-if frames_dir.exists():
-    app.mount("/frames", StaticFiles(directory=frames_dir), name="frames")
+frames_dir.mkdir(parents=True, exist_ok=True)
+app.mount(
+    "/frames",
+    CachedStaticFiles(
+        directory=frames_dir,
+        max_age=int(os.getenv("FRAME_CACHE_MAX_AGE_SECONDS", "604800")),
+    ),
+    name="frames",
+)
 
 # Serve videos from frontend directory
 frontend_videos_dir = Path(
@@ -111,28 +216,61 @@ if frontend_videos_dir.exists():
     app.mount("/api/videos", StaticFiles(directory=frontend_videos_dir), name="videos")
 
 
-# Global connection manager for WebSocket connections
-class ConnectionManager:
-    def __init__(self):
-        self.active_connections: Dict[str, WebSocket] = {}
+# Videos are processed by a pool of workers taking jobs from a queue in MongoDB, and
+# their progress is published to any number of WebSocket subscribers
+job_queue = JobQueue(mongodb_service)
+progress_broker = ProgressBroker()
+
+# Videos are deleted in the background by workers taking jobs from a second queue, and
+# optionally swept up once they are VIDEO_RETENTION_DAYS old
+deletion_queue = JobQueue(
+    mongodb_service,
+    mongodb_service.DELETION_JOB_COLLECTION,
+    waiting_message="Waiting for a deletion worker...",
+)
+video_deleter = VideoDeleter(
+    mongodb_service, video_processor, job_queue, deletion_queue
+)
+retention_sweeper = RetentionSweeper(
+    video_deleter,
+    retention_days=float(os.getenv("VIDEO_RETENTION_DAYS", "0")),
+    interval=float(os.getenv("RETENTION_SWEEP_INTERVAL_SECONDS", "3600")),
+    partial_upload_dir=Path(os.getenv("UPLOAD_DIR", "uploads")) / "partial",
+    partial_upload_max_age=float(os.getenv("PARTIAL_UPLOAD_MAX_AGE_HOURS", "24"))
+    * 3600,
+)
+
+# Minimum seconds between progress updates written to a job, for subscribers in other
+# processes
+PROGRESS_PERSIST_INTERVAL = float(os.getenv("PROGRESS_PERSIST_INTERVAL_SECONDS", "1"))
+progress_persisted_at: Dict[str, float] = {}
 
-    async def connect(self, websocket: WebSocket, video_id: str):
-        await websocket.accept()
-        self.active_connections[video_id] = websocket
 
-    def disconnect(self, video_id: str):
-        if video_id in self.active_connections:
-            del self.active_connections[video_id]
+async def publish_progress(video_id: str, data: dict):
+    progress_broker.publish(video_id, data)
 
-    async def send_progress(self, video_id: str, data: dict):
-        if video_id in self.active_connections:
-            try:
-                await self.active_connections[video_id].send_json(data)
-            except:
-                self.disconnect(video_id)
+    now = time.monotonic()
+    finished = data.get("status") != "processing"
+    if (
+        finished
+        or now - progress_persisted_at.get(video_id, 0) >= PROGRESS_PERSIST_INTERVAL
+    ):
+        progress_persisted_at[video_id] = now
+        try:
+            await job_queue.set_progress(video_id, data)
+        except Exception as e:
+            logger.warning(f"Failed to save progress of video {video_id}: {e}")
+    if finished:
+        progress_persisted_at.pop(video_id, None)
 
 
-manager = ConnectionManager()
+async def enqueue_video(video_id: str):
+    """Queue an uploaded video for processing"""
+    try:
+        await job_queue.enqueue(video_id)
+    except Exception as e:
+        # Retried when a client subscribes to the video's progress
+        logger.warning(f"Failed to queue video {video_id} for processing: {e}")
 
 
 @app.get("/")
@@ -159,6 +297,31 @@ async def debug_search(request: Request):
         return {"error": str(e)}
 
 
+def get_max_upload_size():
+    """Maximum upload size in MB and in bytes"""
+    max_size_mb = int(os.getenv("MAX_FILE_SIZE_MB", "500"))
+    return max_size_mb, max_size_mb * 1024 * 1024
+
+
+def uploaded_response(video_id: str, filename: str) -> UploadResponse:
+    """Response for a video that is ready to be processed"""
+    return UploadResponse(
+        video_id=video_id,
+        message="Video uploaded successfully. Processing will begin shortly.",
+        metadata=VideoMetadata(
+            video_id=video_id,
+            original_filename=filename,
+            duration=0,
+            fps=0,
+            total_frames=0,
+            width=0,
+            height=0,
+            processed_at=None,
+            status="uploaded",
+        ),
+    )
+
+
 @app.post("/upload", response_model=UploadResponse)
 async def upload_video(file: UploadFile = File(...)):
     """Upload and process a video file"""
@@ -167,11 +330,15 @@ async def upload_video(file: UploadFile = File(...)):
         if not file.filename:
             raise HTTPException(status_code=400, detail="No file selected")
 
-        # Check file size (note: file.size may not always be available during upload)
-        max_size_mb = int(os.getenv("MAX_FILE_SIZE_MB", "500"))
-        max_size_bytes = max_size_mb * 1024 * 1024
+        max_size_mb, max_size_bytes = get_max_upload_size()
+
+        # Reject files that are known to be too large before reading any of them
+        if file.size is not None and file.size > max_size_bytes:
+            raise HTTPException(
+                status_code=400,
+                detail=f"File too large ({file.size / (1024*1024):.1f}MB). Maximum size: {max_size_mb}MB",
+            )
 
-        # We'll check size after reading the content
         logger.info(
             f"Uploading file: {file.filename}, content-type: {file.content_type}"
         )
@@ -186,54 +353,199 @@ async def upload_video(file: UploadFile = File(...)):
         file_extension = Path(file.filename).suffix.lower()
         video_path = upload_dir / f"{video_id}{file_extension}"
 
-        # Read and validate file content
-        content = await file.read()
-
-        # Check file size after reading
-        if len(content) > max_size_bytes:
-            raise HTTPException(
-                status_code=400,
-                detail=f"File too large ({len(content) / (1024*1024):.1f}MB). Maximum size: {max_size_mb}MB",
-            )
-
-        # Write file
-        with open(video_path, "wb") as buffer:
-            buffer.write(content)
+        # Copy the spooled file to disk, enforcing the size limit for requests that were
+        # sent without a Content-Length
+        size = 0
+        try:
+            async with aiofiles.open(video_path, "wb") as buffer:
+                while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                    size += len(chunk)
+                    if size > max_size_bytes:
+                        raise HTTPException(
+                            status_code=400,
+                            detail=f"File too large (over {max_size_mb}MB). Maximum size: {max_size_mb}MB",
+                        )
+                    await buffer.write(chunk)
+        except BaseException:
+            video_path.unlink(missing_ok=True)
+            raise
 
         logger.info(
-            f"Video uploaded: {video_id}, size: {len(content)} bytes ({len(content) / (1024*1024):.1f}MB)"
+            f"Video uploaded: {video_id}, size: {size} bytes ({size / (1024*1024):.1f}MB)"
         )
 
-        # Return immediately, processing will happen via WebSocket
-        return UploadResponse(
-            video_id=video_id,
-            message="Video uploaded successfully. Processing will begin shortly.",
-            metadata=VideoMetadata(
-                video_id=video_id,
-                original_filename=file.filename,
-                duration=0,
-                fps=0,
-                total_frames=0,
-                width=0,
-                height=0,
-                processed_at=None,
-                status="uploaded",
-            ),
-        )
+        # Return immediately, processing happens in the background
+        await enqueue_video(video_id)
+        return uploaded_response(video_id, file.filename)
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Upload failed: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+# Chunked uploads let large files be sent in pieces and resumed after a dropped
+# connection. Partial files live in UPLOAD_DIR/partial until they are completed, or
+# removed by the retention sweeper once abandoned. Each upload's lock is only kept while
+# requests to it are in flight
+upload_locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = (
+    weakref.WeakValueDictionary()
+)
+
+
+def get_partial_upload_paths(upload_id: str):
+    """Paths of the partial file and state of a chunked upload"""
+    try:
+        upload_id = str(uuid.UUID(upload_id))
+    except ValueError:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    partial_dir = Path(os.getenv("UPLOAD_DIR", "uploads")) / "partial"
+    return partial_dir / f"{upload_id}.part", partial_dir / f"{upload_id}.json"
+
+
+def get_upload_lock(upload_id: str) -> asyncio.Lock:
+    """Lock serializing requests to a chunked upload, which must exist"""
+    part_path, _ = get_partial_upload_paths(upload_id)
+    if not part_path.exists():
+        raise HTTPException(status_code=404, detail="Upload not found")
+    lock = upload_locks.get(part_path.stem)
+    if lock is None:
+        lock = upload_locks[part_path.stem] = asyncio.Lock()
+    return lock
+
+
+def get_chunked_upload_status(upload_id: str) -> ChunkedUploadStatus:
+    part_path, state_path = get_partial_upload_paths(upload_id)
+    if not state_path.exists() or not part_path.exists():
+        raise HTTPException(status_code=404, detail="Upload not found")
+    state = json.loads(state_path.read_text())
+    return ChunkedUploadStatus(
+        upload_id=upload_id,
+        filename=state["filename"],
+        size=state["size"],
+        received=part_path.stat().st_size,
+    )
+
+
+@app.post("/upload/chunked", response_model=ChunkedUploadStatus)
+async def start_chunked_upload(upload: ChunkedUploadRequest):
+    """Start a chunked upload of a file of the given size"""
+    if not upload.filename:
+        raise HTTPException(status_code=400, detail="No file selected")
+    max_size_mb, max_size_bytes = get_max_upload_size()
+    if upload.size <= 0 or upload.size > max_size_bytes:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid file size ({upload.size / (1024*1024):.1f}MB). Maximum size: {max_size_mb}MB",
+        )
+
+    upload_id = str(uuid.uuid4())
+    part_path, state_path = get_partial_upload_paths(upload_id)
+    part_path.parent.mkdir(parents=True, exist_ok=True)
+    state_path.write_text(
+        json.dumps({"filename": upload.filename, "size": upload.size})
+    )
+    part_path.touch()
+    logger.info(f"Started chunked upload {upload_id} of {upload.filename}")
+
+    return get_chunked_upload_status(upload_id)
+
+
+@app.get("/upload/chunked/{upload_id}", response_model=ChunkedUploadStatus)
+async def get_chunked_upload(upload_id: str):
+    """Get how many bytes of a chunked upload were received, to resume it"""
+    return get_chunked_upload_status(upload_id)
+
+
+@app.put("/upload/chunked/{upload_id}", response_model=ChunkedUploadStatus)
+async def upload_chunk(upload_id: str, offset: int, request: Request):
+    """Append the request body to a chunked upload, starting at offset"""
+    async with get_upload_lock(upload_id):
+        status = get_chunked_upload_status(upload_id)
+        if offset != status.received:
+            raise HTTPException(
+                status_code=409,
+                detail=f"Chunk offset {offset} does not match the {status.received} bytes received",
+            )
+
+        part_path, _ = get_partial_upload_paths(upload_id)
+        received = status.received
+        async with aiofiles.open(part_path, "ab") as buffer:
+            async for chunk in request.stream():
+                received += len(chunk)
+                if received > status.size:
+                    break
+                await buffer.write(chunk)
+
+        if received > status.size:
+            # Drop the whole chunk so the client can resend it from the same offset
+            os.truncate(part_path, offset)
+            raise HTTPException(
+                status_code=400,
+                detail=f"Chunk exceeds the declared file size of {status.size} bytes",
+            )
+
+        return get_chunked_upload_status(upload_id)
+
+
+@app.post("/upload/chunked/{upload_id}/complete", response_model=UploadResponse)
+async def complete_chunked_upload(upload_id: str):
+    """Finish a chunked upload, making the video ready for processing"""
+    async with get_upload_lock(upload_id):
+        status = get_chunked_upload_status(upload_id)
+        if status.received != status.size:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Upload incomplete: received {status.received} of {status.size} bytes",
+            )
+
+        part_path, state_path = get_partial_upload_paths(upload_id)
+        upload_dir = Path(os.getenv("UPLOAD_DIR", "uploads"))
+        file_extension = Path(status.filename).suffix.lower()
+        os.replace(part_path, upload_dir / f"{status.upload_id}{file_extension}")
+        state_path.unlink()
+    await enqueue_video(status.upload_id)
+
+    logger.info(
+        f"Video uploaded: {status.upload_id}, size: {status.size} bytes ({status.size / (1024*1024):.1f}MB)"
+    )
+    return uploaded_response(status.upload_id, status.filename)
+
+
 @app.websocket("/ws/{video_id}")
 async def websocket_endpoint(websocket: WebSocket, video_id: str):
     """WebSocket endpoint for real-time processing updates"""
-    await manager.connect(websocket, video_id)
+    await websocket.accept()
+    updates = progress_broker.subscribe(video_id)
+    poll_interval = float(os.getenv("PROGRESS_POLL_INTERVAL_SECONDS", "2"))
 
     try:
-        # Start processing the video
-        await process_video_async(video_id)
+        # Uploads that weren't queued yet are queued now
+        upload_dir = Path(os.getenv("UPLOAD_DIR", "uploads"))
+        if list(upload_dir.glob(f"{video_id}.*")):
+            await enqueue_video(video_id)
+
+        progress = progress_broker.latest(video_id)
+        if progress is None:
+            progress = await job_queue.get_progress(video_id)
+        sent = None
+        while progress is not None and progress.get("status") == "processing":
+            if progress != sent:
+                await websocket.send_json(progress)
+                sent = progress
+            try:
+                progress = await asyncio.wait_for(updates.get(), poll_interval)
+            except asyncio.TimeoutError:
+                # The video may be processed by another process
+                progress = await job_queue.get_progress(video_id)
+        if progress is None:
+            progress = {
+                "status": "failed",
+                "progress": 0,
+                "message": f"Processing failed: no video found for ID {video_id}",
+            }
+        await websocket.send_json(progress)
 
         # Keep connection alive for any additional messages
         while True:
@@ -246,100 +558,130 @@ async def websocket_endpoint(websocket: WebSocket, video_id: str):
         pass
     except Exception as e:
         logger.error(f"WebSocket error: {e}")
-        await manager.send_progress(
-            video_id,
-            {
-                "status": "failed",
-                "progress": 0,
-                "message": f"Processing failed: {e!s}",
-            },
-        )
     finally:
-        manager.disconnect(video_id)
+        progress_broker.unsubscribe(video_id, updates)
 
 
-async def process_video_async(video_id: str):
-    """Process video asynchronously with progress updates"""
+async def run_processing_job(job: dict, worker_id: str):
+    """Process the video of a job claimed by a worker"""
+    video_id = job["_id"]
     try:
-        # Find the video file
-        upload_dir = Path(os.getenv("UPLOAD_DIR", "uploads"))
-        video_files = list(upload_dir.glob(f"{video_id}.*"))
-
-        if not video_files:
-            raise FileNotFoundError(f"Video file not found for ID: {video_id}")
-
-        video_path = video_files[0]
-
-        # Progress callback
-        async def progress_callback(data):
-            await manager.send_progress(video_id, data)
-
-        # Process video (extract frames)
-        await manager.send_progress(
-            video_id,
-            {
-                "status": "processing",
-                "progress": 0,
-                "message": "Starting video processing...",
-            },
-        )
-
-        result = await video_processor.process_video(
-            str(video_path), video_id, progress_callback, mongodb_service, ai_service
-        )
-
-        # All frames should have been processed progressively during extraction
-        total_frames = len(result["frames_data"])
-        logger.info(f"Progressive processing completed for {total_frames} frames")
-
-        # Save video metadata
-        await manager.send_progress(
-            video_id,
-            {
-                "status": "processing",
-                "progress": 98,
-                "message": "Finalizing video metadata...",
-            },
-        )
-
-        # Insert video metadata
-        logger.info(f"Attempting to insert video metadata for video {video_id}")
-        logger.info(f"Video metadata: {result['video_metadata']}")
-
-        # Insert metadata with completed status directly
-        from datetime import datetime
-
-        result["video_metadata"]["status"] = "completed"
-        result["video_metadata"]["processed_at"] = datetime.utcnow()
-        await mongodb_service.insert_video_metadata(result["video_metadata"])
-
-        # No need to update status separately since it's included in metadata
-        logger.info(f"Video metadata inserted successfully for video {video_id}")
-
-        # Cleanup video file (keep frames)
-        video_path.unlink()
-
-        # Final success message
-        await manager.send_progress(
-            video_id,
-            {
-                "status": "completed",
-                "progress": 100,
-                "message": f"Processing complete! {total_frames} frames processed and ready for search.",
-                "frames_processed": total_frames,
-            },
-        )
-
+        await process_video_async(video_id, resume=job["attempts"] > 1)
     except Exception as e:
         logger.error(f"Async processing failed: {e}")
-        await manager.send_progress(
+        retrying = job["attempts"] < job_queue.max_attempts
+        await publish_progress(
             video_id,
             {
-                "status": "failed",
+                "status": "processing" if retrying else "failed",
                 "progress": 0,
-                "message": f"Processing failed: {e!s}",
+                "message": f"Processing failed, retrying: {e!s}"
+                if retrying
+                else f"Processing failed: {e!s}",
             },
         )
+        raise
+
+
+async def process_video_async(video_id: str, resume: bool = False):
+    """Process video with progress updates, continuing an interrupted run if resume"""
+    # Find the video file
+    upload_dir = Path(os.getenv("UPLOAD_DIR", "uploads"))
+    video_files = list(upload_dir.glob(f"{video_id}.*"))
+
+    if not video_files:
+        raise FileNotFoundError(f"Video file not found for ID: {video_id}")
+
+    video_path = video_files[0]
+
+    # Progress callback. The video isn't complete until its metadata is saved below, and
+    # failures are published by run_processing_job, which knows if the job will be retried
+    async def progress_callback(data):
+        if data.get("status") == "failed":
+            return
+        if data.get("status") == "completed":
+            data = {**data, "status": "processing", "progress": 97}
+        await publish_progress(video_id, data)
+
+    # Frames saved before an earlier attempt was interrupted aren't processed again
+    saved_frames = None
+    if resume:
+        saved_frames = await mongodb_service.get_saved_frame_numbers(video_id)
+        logger.info(f"Resuming video {video_id} with {len(saved_frames)} saved frames")
+
+    # Process video (extract frames)
+    await publish_progress(
+        video_id,
+        {
+            "status": "processing",
+            "progress": 0,
+            "message": "Starting video processing...",
+        },
+    )
+
+    result = await video_processor.process_video(
+        str(video_path),
+        video_id,
+        progress_callback,
+        mongodb_service,
+        ai_service,
+        saved_frames,
+    )
+
+    # All frames should have been processed progressively during extraction
+    total_frames = len(result["frames_data"])
+    logger.info(f"Progressive processing completed for {total_frames} frames")
+
+    # Save video metadata
+    await publish_progress(
+        video_id,
+        {
+            "status": "processing",
+            "progress": 98,
+            "message": "Finalizing video metadata...",
+        },
+    )
+
+    # Insert video metadata
+    logger.info(f"Attempting to insert video metadata for video {video_id}")
+    logger.info(f"Video metadata: {result['video_metadata']}")
+
+    # Insert metadata with completed status directly
+    from datetime import datetime
+
+    result["video_metadata"]["status"] = "completed"
+    result["video_metadata"]["processed_at"] = datetime.utcnow()
+    await mongodb_service.insert_video_metadata(result["video_metadata"])
+    invalidate_video_results(video_id)
+
+    # No need to update status separately since it's included in metadata
+    logger.info(f"Video metadata inserted successfully for video {video_id}")
+
+    # Cleanup video file (keep frames). It may have been moved for playback already
+    video_path.unlink(missing_ok=True)
+
+    # Final success message
+    await publish_progress(
+        video_id,
+        {
+            "status": "completed",
+            "progress": 100,
+            "message": f"Processing complete! {total_frames} frames processed and ready for search.",
+            "frames_processed": total_frames,
+        },
+    )
+
+
+def frame_thumbnail_path(frame: dict) -> str:
+    """URL path of a frame's thumbnail"""
+    # Thumbnail paths are stored with each frame. Frames saved before that need a
+    # filesystem check to find theirs
+    thumbnail_path = frame.get("thumbnail_path")
+    if not thumbnail_path:
+        thumbnail_path = frame.get("file_path", "").replace("frame_", "thumb_")
+        if not os.path.exists(thumbnail_path):
+            thumbnail_path = frame.get("file_path", "")
+    return thumbnail_path.replace(str(frames_dir), "/frames")
 
 
 @app.post("/search", response_model=SearchResponse)
@@ -358,58 +700,111 @@ async def search_frames(query: SearchQuery):
             f"🔍 Search request: '{query.query}' (type={search_type}, top_k={query.top_k})"
         )
 
+        # Repeated searches are served from the result cache
+        video_filter = getattr(query, "video_id", None)
+        cache_key = (
+            normalize_query(query.query),
+            search_type,
+            query.top_k,
+            video_filter,
+        )
+        cached_results = search_result_cache.get(cache_key)
+        if cached_results is not None:
+            logger.info(f"⚡ Returning {len(cached_results)} cached results")
+            processing_time = time.time() - start_time
+            SEARCH_SECONDS.labels(search_type=search_type, cached="true").observe(
+                processing_time
+            )
+            return SearchResponse(
+                query=query.query,
+                results=cached_results,
+                total_results=len(cached_results),
+                processing_time=processing_time,
+            )
+
+        # Milliseconds spent in each stage, logged with the request
+        spans = {}
+
         # Generate query embedding only if needed (not for pure text search)
         query_embedding = None
         if search_type != "text":
-            query_embedding = await ai_service.get_query_embedding(query.query)
+            with timed(
+                SEARCH_STAGE_SECONDS, spans, search_type=search_type, stage="embedding"
+            ):
+                query_embedding = await ai_service.get_query_embedding(query.query)
             logger.info(
                 f"📊 Generated query embedding: {len(query_embedding)} dimensions"
             )
 
         # Perform search based on specified type
-        video_filter = getattr(query, "video_id", None)
-        if search_type == "semantic":
-            search_results = await mongodb_service.semantic_search(
-                query_embedding, query.top_k, video_filter=video_filter
-            )
-            logger.info(f"🧠 Semantic search returned {len(search_results)} results")
-        elif search_type == "text":
-            search_results = await mongodb_service.text_search(
-                query.query, query.top_k, video_filter=video_filter
-            )
-            logger.info(f"📝 Text search returned {len(search_results)} results")
-        else:  # hybrid
-            search_results = await mongodb_service.hybrid_search(
-                query.query, query_embedding, query.top_k, video_filter=video_filter
-            )
-            logger.info(f"🔀 Hybrid search returned {len(search_results)} results")
+        with timed(
+            SEARCH_STAGE_SECONDS, spans, search_type=search_type, stage="aggregation"
+        ):
+            if search_type == "semantic":
+                search_results = await mongodb_service.semantic_search(
+                    query_embedding, query.top_k, video_filter=video_filter
+                )
+                logger.info(
+                    f"🧠 Semantic search returned {len(search_results)} results"
+                )
+            elif search_type == "text":
+                search_results = await mongodb_service.text_search(
+                    query.query, query.top_k, video_filter=video_filter
+                )
+                logger.info(f"📝 Text search returned {len(search_results)} results")
+            else:  # hybrid
+                search_results = await mongodb_service.hybrid_search(
+                    query.query,
+                    query_embedding,
+                    query.top_k,
+                    video_filter=video_filter,
+                )
+                logger.info(f"🔀 Hybrid search returned {len(search_results)} results")
 
         # Convert to response format with raw similarity scores
         results = []
-
-        for index, result in enumerate(search_results):
-            # Generate thumbnail path for frontend
-            thumbnail_path = result.get("file_path", "").replace("frame_", "thumb_")
-            if not os.path.exists(thumbnail_path):
-                thumbnail_path = result.get("file_path", "")
-
-            # For hybrid search, show rank (index + 1), otherwise show rounded similarity score
-            if search_type == "hybrid":
-                display_score = index + 1  # Rank (1-based)
-            else:
-                display_score = round(result.get("similarity_score", 0.0), 3)
-
-            search_result = SearchResult(
-                frame_number=result.get("frame_number", 0),
-                timestamp=result.get("timestamp", 0.0),
-                description=result.get("description", "No description available"),
-                similarity_score=display_score,
-                thumbnail_path=thumbnail_path.replace(str(frames_dir), "/frames"),
-                metadata=result.get("metadata", {}),
-            )
-            results.append(search_result)
-
+        thumbnail_check_seconds = 0.0
+
+        with timed(
+            SEARCH_STAGE_SECONDS, spans, search_type=search_type, stage="result_shaping"
+        ):
+            for index, result in enumerate(search_results):
+                check_start = time.perf_counter()
+                thumbnail_path = frame_thumbnail_path(result)
+                thumbnail_check_seconds += time.perf_counter() - check_start
+
+                # For hybrid search, show rank (index + 1), otherwise show rounded similarity score
+                if search_type == "hybrid":
+                    display_score = index + 1  # Rank (1-based)
+                else:
+                    display_score = round(result.get("similarity_score", 0.0), 3)
+
+                search_result = SearchResult(
+                    frame_number=result.get("frame_number", 0),
+                    timestamp=result.get("timestamp", 0.0),
+                    description=result.get("description", "No description available"),
+                    similarity_score=display_score,
+                    thumbnail_path=thumbnail_path,
+                    metadata=result.get("metadata", {}),
+                )
+                results.append(search_result)
+
+        # Thumbnail checks are part of result shaping, but tracked on their own since
+        # they hit the filesystem once per result
+        SEARCH_STAGE_SECONDS.labels(
+            search_type=search_type, stage="thumbnail_check"
+        ).observe(thumbnail_check_seconds)
+        spans["thumbnail_check"] = thumbnail_check_seconds * 1000
+
+        search_result_cache.put(cache_key, results)
         processing_time = time.time() - start_time
+        SEARCH_SECONDS.labels(search_type=search_type, cached="false").observe(
+            processing_time
+        )
+        logger.info(
+            "⏱️ Search stages: "
+            + ", ".join(f"{stage}={ms:.1f}ms" for stage, ms in spans.items())
+        )
 
         return SearchResponse(
             query=query.query,
@@ -423,6 +818,121 @@ async def search_frames(query: SearchQuery):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/search/segments", response_model=SegmentSearchResponse)
+async def search_segments(query: SegmentSearchQuery):
+    """Search for video segments, merging adjacent matching frames of each video"""
+    try:
+        start_time = time.time()
+        logger.info(
+            f"🎞️ Segment search request: '{query.query}' (top_k={query.top_k}, video_id={query.video_id})"
+        )
+
+        cache_key = (
+            normalize_query(query.query),
+            "segments",
+            query.top_k,
+            query.video_id,
+            query.max_gap_seconds,
+            query.segments_per_video,
+        )
+        cached_segments = search_result_cache.get(cache_key)
+        if cached_segments is not None:
+            processing_time = time.time() - start_time
+            SEARCH_SECONDS.labels(search_type="segments", cached="true").observe(
+                processing_time
+            )
+            return SegmentSearchResponse(
+                query=query.query,
+                segments=cached_segments,
+                total_segments=len(cached_segments),
+                processing_time=processing_time,
+            )
+
+        spans = {}
+        with timed(
+            SEARCH_STAGE_SECONDS, spans, search_type="segments", stage="embedding"
+        ):
+            query_embedding = await ai_service.get_query_embedding(query.query)
+
+        with timed(
+            SEARCH_STAGE_SECONDS, spans, search_type="segments", stage="aggregation"
+        ):
+            segment_results = await mongodb_service.segment_search(
+                query_embedding,
+                query.top_k,
+                video_filter=query.video_id,
+                max_gap=query.max_gap_seconds,
+                segments_per_video=query.segments_per_video,
+            )
+
+        with timed(
+            SEARCH_STAGE_SECONDS, spans, search_type="segments", stage="result_shaping"
+        ):
+            segments = []
+            for segment in segment_results:
+                best_frame = segment["best_frame"]
+                segments.append(
+                    SearchSegment(
+                        video_id=segment["video_id"],
+                        start_time=segment["start_time"],
+                        end_time=segment["end_time"],
+                        frame_count=segment["frame_count"],
+                        similarity_score=round(segment["similarity_score"], 3),
+                        average_score=round(segment["average_score"], 3),
+                        best_frame=SearchResult(
+                            frame_number=best_frame.get("frame_number", 0),
+                            timestamp=best_frame.get("timestamp", 0.0),
+                            description=best_frame.get(
+                                "description", "No description available"
+                            ),
+                            similarity_score=round(
+                                best_frame.get("similarity_score", 0.0), 3
+                            ),
+                            thumbnail_path=frame_thumbnail_path(best_frame),
+                            metadata=best_frame.get("metadata") or {},
+                        ),
+                    )
+                )
+
+        search_result_cache.put(cache_key, segments)
+        processing_time = time.time() - start_time
+        SEARCH_SECONDS.labels(search_type="segments", cached="false").observe(
+            processing_time
+        )
+        logger.info(
+            "⏱️ Segment search stages: "
+            + ", ".join(f"{stage}={ms:.1f}ms" for stage, ms in spans.items())
+        )
+
+        return SegmentSearchResponse(
+            query=query.query,
+            segments=segments,
+            total_segments=len(segments),
+            processing_time=processing_time,
+        )
+
+    except Exception as e:
+        logger.error(f"Segment search failed: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/cache/stats")
+async def get_cache_stats():
+    """Get hit rates of the query embedding, search result and frame description caches"""
+    return {
+        "query_embeddings": query_embedding_cache.stats(),
+        "search_results": search_result_cache.stats(),
+        "frame_descriptions": description_cache.stats(),
+    }
+
+
+@app.get("/metrics")
+async def get_metrics():
+    """Search and ingestion latency histograms in the Prometheus text format"""
+    content, content_type = render_metrics()
+    return Response(content=content, media_type=content_type)
+
+
 @app.get("/videos")
 async def get_uploaded_videos():
     """Get list of all uploaded videos"""
@@ -447,36 +957,66 @@ async def get_video_metadata(video_id: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.delete("/video/{video_id}")
+@app.delete("/video/{video_id}", status_code=202)
 async def delete_video(video_id: str):
-    """Delete a video and all associated data"""
+    """Queue a video and all associated data for deletion"""
     try:
-        # Cleanup database
-        await mongodb_service.cleanup_video_data(video_id)
-
-        # Cleanup files
-        await video_processor.cleanup_video_files(video_id)
-
-        return {"message": f"Video {video_id} deleted successfully"}
+        queued = await video_deleter.request(video_id)
+        return {
+            "message": f"Video {video_id} is being deleted",
+            "video_id": video_id,
+            "queued": queued,
+        }
 
     except Exception as e:
         logger.error(f"Failed to delete video: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.get("/frames/{video_id}/{frame_name}")
-async def get_frame(video_id: str, frame_name: str):
-    """Serve frame images"""
+@app.get("/video/{video_id}/deletion")
+async def get_deletion_progress(video_id: str):
+    """Get the progress of a video's deletion"""
+    try:
+        progress = await video_deleter.get_progress(video_id)
+    except Exception as e:
+        logger.error(f"Failed to get deletion progress: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+    if progress is None:
+        raise HTTPException(status_code=404, detail="Video is not being deleted")
+    return progress
+
+
+@app.post("/retention/sweep")
+async def run_retention_sweep(older_than_days: Optional[float] = None):
+    """Queue every video older than older_than_days (default VIDEO_RETENTION_DAYS) for deletion"""
+    days = (
+        older_than_days
+        if older_than_days is not None
+        else retention_sweeper.retention_days
+    )
+    if days <= 0:
+        raise HTTPException(
+            status_code=400,
+            detail="older_than_days is required when VIDEO_RETENTION_DAYS is not set",
+        )
     try:
-        frame_path = frames_dir / video_id / frame_name
-        if not frame_path.exists():
-            raise HTTPException(status_code=404, detail="Frame not found")
+        return await retention_sweeper.sweep(days)
+    except Exception as e:
+        logger.error(f"Retention sweep failed: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
 
-        return FileResponse(frame_path)
 
+@app.get("/retention/sweep")
+async def get_retention_sweep():
+    """Get the progress of the last retention sweep run by this process"""
+    try:
+        status = await retention_sweeper.status()
     except Exception as e:
-        logger.error(f"Failed to serve frame: {e}")
+        logger.error(f"Failed to get retention sweep status: {e}")
         raise HTTPException(status_code=500, detail=str(e))
+    if status is None:
+        raise HTTPException(status_code=404, detail="No retention sweep has run")
+    return status
 
 
 if __name__ == "__main__":
@@ -40,7 +40,44 @@ class SearchResponse(BaseModel):
     processing_time: float
 
 
+class SegmentSearchQuery(BaseModel):
+    query: str
+    top_k: int = 10
+    video_id: Optional[str] = None
+    max_gap_seconds: Optional[float] = None
+    segments_per_video: Optional[int] = None
+
+
+class SearchSegment(BaseModel):
+    video_id: str
+    start_time: float
+    end_time: float
+    frame_count: int
+    similarity_score: float
+    average_score: float
+    best_frame: SearchResult
+
+
+class SegmentSearchResponse(BaseModel):
+    query: str
+    segments: List[SearchSegment]
+    total_segments: int
+    processing_time: float
+
+
 class UploadResponse(BaseModel):
     video_id: str
     message: str
     metadata: VideoMetadata
+
+
+class ChunkedUploadRequest(BaseModel):
+    filename: str
+    size: int
+
+
+class ChunkedUploadStatus(BaseModel):
+    upload_id: str
+    filename: str
+    size: int
+    received: int
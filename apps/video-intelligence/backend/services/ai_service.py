@@ -1,15 +1,46 @@
 import asyncio
 import base64
+import hashlib
+import json
 import logging
 import os
+from pathlib import Path
 from typing import List
 
 import openai
 import voyageai
 from PIL import Image
 
+from .description_cache import description_cache
+from .request_batcher import RequestBatcher
+from .search_cache import normalize_query, query_embedding_cache
+
 logger = logging.getLogger(__name__)
 
+DESCRIPTION_MODEL = "gpt-4o"
+
+FRAME_DESCRIPTION_PROMPT = """Analyze this video frame and provide a detailed description including:
+1. Main subjects or people in the scene
+2. Actions or activities taking place
+3. Setting/environment (indoor/outdoor, location type)
+4. Objects, props, or notable elements
+5. Overall mood or atmosphere
+6. Any text or graphics visible
+
+Keep the description concise but informative, around 2-3 sentences."""
+
+BATCH_DESCRIPTION_PROMPT = """You are given {count} frames from a video, in order. Analyze each frame and provide a detailed description of it including:
+1. Main subjects or people in the scene
+2. Actions or activities taking place
+3. Setting/environment (indoor/outdoor, location type)
+4. Objects, props, or notable elements
+5. Overall mood or atmosphere
+6. Any text or graphics visible
+
+Keep each description concise but informative, around 2-3 sentences. Describe every frame on its own, without referring to the other frames, since each description is searched separately.
+
+Respond with a JSON object of the form {{"descriptions": ["...", "..."]}} containing exactly {count} descriptions, one per frame, in the order the frames were given."""
+
 
 class AIService:
     def __init__(self):
@@ -23,6 +54,32 @@ class AIService:
             f"AI service initialized with embedding dimensions: {self.EMBEDDING_DIM_SIZE}"
         )
 
+        # Concurrent frame embeddings are sent to Voyage AI in batches. Queries bypass the
+        # batcher so search latency never includes the batching wait. At most
+        # AI_CONCURRENCY frames are embedded at once, so larger batches never fill
+        self.embedding_batcher = RequestBatcher(
+            self._multimodal_embed,
+            max_batch_size=int(
+                os.getenv("EMBEDDING_BATCH_SIZE", os.getenv("AI_CONCURRENCY", "5"))
+            ),
+            max_wait=float(os.getenv("EMBEDDING_BATCH_WAIT_MS", "50")) / 1000,
+            name="embedding",
+        )
+
+        # Frames described together in one GPT-4o request. 1 describes each frame on
+        # its own
+        self.description_batcher = RequestBatcher(
+            self._describe_frames,
+            max_batch_size=int(os.getenv("DESCRIPTION_BATCH_SIZE", "1")),
+            max_wait=float(os.getenv("DESCRIPTION_BATCH_WAIT_MS", "200")) / 1000,
+            name="description",
+        )
+        # Cached descriptions are only reused for the same model and prompts. Either
+        # prompt may have produced a description, depending on how frames were batched
+        self.description_cache_namespace = hashlib.sha256(
+            f"{DESCRIPTION_MODEL}\n{FRAME_DESCRIPTION_PROMPT}\n{BATCH_DESCRIPTION_PROMPT}".encode()
+        ).hexdigest()
+
     def _initialize_clients(self):
         """Initialize AI service clients (lazy loading)"""
         if self._clients_initialized:
@@ -50,12 +107,23 @@ class AIService:
         except Exception as e:
             logger.error(f"Failed to initialize AI clients: {e}")
 
+    def _multimodal_embed(self, inputs: List, input_type: str) -> List[List[float]]:
+        """Embed several images or texts with a single Voyage AI request"""
+        result = self.voyage_client.multimodal_embed(
+            inputs=[[data] for data in inputs],
+            model="voyage-multimodal-3",
+            input_type=input_type,
+        )
+        return result.embeddings
+
     async def get_voyage_embedding(
         self, data, input_type: str = "document"
     ) -> List[float]:
         """
         Get Voyage AI multimodal embeddings for images and text.
 
+        Documents are coalesced with other concurrent requests into batched API calls.
+
         Args:
             data: PIL Image object, image file path, or text string
             input_type: "document" or "query"
@@ -75,7 +143,8 @@ class AIService:
                 (".jpg", ".jpeg", ".png", ".gif", ".bmp")
             ):
                 # For image file paths, load the image with PIL
-                image = Image.open(data)
+                with Image.open(data) as image:
+                    image.load()
                 embed_data = image
             elif hasattr(data, "mode"):  # PIL Image object
                 # Already a PIL Image
@@ -84,28 +153,95 @@ class AIService:
                 # Text data
                 embed_data = data
 
+            if input_type == "document":
+                return await self.embedding_batcher.submit(embed_data, input_type)
+
             # Run in thread pool to avoid blocking
-            loop = asyncio.get_event_loop()
-            result = await loop.run_in_executor(
-                None,
-                lambda: self.voyage_client.multimodal_embed(
-                    inputs=[[embed_data]],
-                    model="voyage-multimodal-3",
-                    input_type=input_type,
-                ),
+            embeddings = await asyncio.to_thread(
+                self._multimodal_embed, [embed_data], input_type
             )
-
-            return result.embeddings[0]
+            return embeddings[0]
 
         except Exception as e:
             logger.error(f"Failed to get Voyage embedding: {e}")
             # Return dummy embedding for development/testing
             return [0.0] * self.EMBEDDING_DIM_SIZE
 
+    @staticmethod
+    def _image_content(image_data: str) -> dict:
+        return {
+            "type": "image_url",
+            "image_url": {
+                "url": f"data:image/jpeg;base64,{image_data}",
+                "detail": "low",
+            },
+        }
+
+    def _describe_frame(self, image_data: str) -> str:
+        """Describe one base64-encoded JPEG frame"""
+        response = self.openai_client.chat.completions.create(
+            model=DESCRIPTION_MODEL,
+            messages=[
+                {
+                    "role": "user",
+                    "content": [
+                        {"type": "text", "text": FRAME_DESCRIPTION_PROMPT},
+                        self._image_content(image_data),
+                    ],
+                }
+            ],
+            max_tokens=300,
+        )
+        return response.choices[0].message.content.strip()
+
+    def _describe_frames(self, images: List[str], group: str = "") -> List[str]:
+        """Describe several base64-encoded JPEG frames with a single GPT-4o request"""
+        if len(images) == 1:
+            return [self._describe_frame(images[0])]
+
+        response = self.openai_client.chat.completions.create(
+            model=DESCRIPTION_MODEL,
+            messages=[
+                {
+                    "role": "user",
+                    "content": [
+                        {
+                            "type": "text",
+                            "text": BATCH_DESCRIPTION_PROMPT.format(count=len(images)),
+                        },
+                        *(self._image_content(image_data) for image_data in images),
+                    ],
+                }
+            ],
+            max_tokens=300 * len(images),
+            response_format={"type": "json_object"},
+        )
+        try:
+            descriptions = json.loads(response.choices[0].message.content)[
+                "descriptions"
+            ]
+            if len(descriptions) != len(images) or not all(
+                isinstance(description, str) and description.strip()
+                for description in descriptions
+            ):
+                raise ValueError(
+                    f"expected {len(images)} descriptions, got {descriptions!r:.200}"
+                )
+        except (ValueError, KeyError, TypeError) as e:
+            logger.warning(
+                f"Couldn't parse descriptions of {len(images)} frames ({e}), "
+                "describing them one at a time"
+            )
+            return [self._describe_frame(image_data) for image_data in images]
+        return [description.strip() for description in descriptions]
+
     async def generate_frame_description(self, image_path: str) -> str:
         """
         Generate detailed description of a video frame using GPT-4 Vision
 
+        Descriptions are cached by image content, and with DESCRIPTION_BATCH_SIZE above 1
+        concurrent frames are described together.
+
         Args:
             image_path: Path to the frame image
 
@@ -122,46 +258,26 @@ class AIService:
                 )
                 return "Frame description unavailable - OpenAI API key not configured"
 
-            # Convert image to base64
-            with open(image_path, "rb") as image_file:
-                image_data = base64.b64encode(image_file.read()).decode()
-
-            prompt = """Analyze this video frame and provide a detailed description including:
-1. Main subjects or people in the scene
-2. Actions or activities taking place
-3. Setting/environment (indoor/outdoor, location type)
-4. Objects, props, or notable elements
-5. Overall mood or atmosphere
-6. Any text or graphics visible
+            image_bytes = await asyncio.to_thread(Path(image_path).read_bytes)
+            cache_key = description_cache.key(
+                image_bytes, self.description_cache_namespace
+            )
+            description = await description_cache.get(cache_key)
+            if description is not None:
+                return description
 
-Keep the description concise but informative, around 2-3 sentences."""
+            # Convert image to base64
+            image_data = base64.b64encode(image_bytes).decode()
 
-            # Run in thread pool to avoid blocking
-            loop = asyncio.get_event_loop()
-            response = await loop.run_in_executor(
-                None,
-                lambda: self.openai_client.chat.completions.create(
-                    model="gpt-4o",
-                    messages=[
-                        {
-                            "role": "user",
-                            "content": [
-                                {"type": "text", "text": prompt},
-                                {
-                                    "type": "image_url",
-                                    "image_url": {
-                                        "url": f"data:image/jpeg;base64,{image_data}",
-                                        "detail": "low",
-                                    },
-                                },
-                            ],
-                        }
-                    ],
-                    max_tokens=300,
-                ),
-            )
+            if self.description_batcher.max_batch_size > 1:
+                description = await self.description_batcher.submit(
+                    image_data, "description"
+                )
+            else:
+                # Run in thread pool to avoid blocking
+                description = await asyncio.to_thread(self._describe_frame, image_data)
 
-            description = response.choices[0].message.content.strip()
+            await description_cache.put(cache_key, description)
             return description
 
         except Exception as e:
@@ -169,9 +285,16 @@ Keep the description concise but informative, around 2-3 sentences."""
             return f"Frame at {image_path} - description generation failed"
 
     async def get_query_embedding(self, query_text: str) -> List[float]:
-        """Get embedding for search query"""
+        """Get embedding for search query, reusing cached embeddings of repeated queries"""
         try:
-            return await self.get_voyage_embedding(query_text, "query")
+            key = normalize_query(query_text)
+            embedding = query_embedding_cache.get(key)
+            if embedding is None:
+                embedding = await self.get_voyage_embedding(query_text, "query")
+                # Failed requests return a zero vector, which shouldn't be cached
+                if any(embedding):
+                    query_embedding_cache.put(key, embedding)
+            return embedding
         except Exception as e:
             logger.error(f"Failed to get query embedding: {e}")
             return [0.0] * self.EMBEDDING_DIM_SIZE
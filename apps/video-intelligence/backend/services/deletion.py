@@ -0,0 +1,248 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from .job_queue import JobQueue
+from .search_cache import invalidate_video_results
+
+logger = logging.getLogger(__name__)
+
+
+class VideoDeleter:
+    """Deletes videos in the background, through a queue of deletion jobs.
+
+    Deleting a video marks it as "deleting" so it drops out of the video list, and queues
+    a job that removes its frames in batches, its files from disk and finally its
+    metadata. Deletion jobs are leased and retried like processing jobs, so a deletion
+    interrupted by a restart is finished by another worker.
+    """
+
+    def __init__(
+        self,
+        mongodb_service,
+        video_processor,
+        job_queue: JobQueue,
+        deletion_queue: JobQueue,
+    ):
+        self.mongodb_service = mongodb_service
+        self.video_processor = video_processor
+        self.job_queue = job_queue
+        self.deletion_queue = deletion_queue
+
+    async def request(self, video_id: str) -> bool:
+        """Queue a video for deletion. Returns False if it is already being deleted"""
+        await self.mongodb_service.mark_video_deleting(video_id)
+        invalidate_video_results(video_id)
+        if await self.deletion_queue.enqueue(video_id):
+            return True
+        # Give up on a previous deletion that ran out of attempts and start over
+        return await self.deletion_queue.retry(video_id)
+
+    async def get_progress(self, video_id: str) -> Optional[Dict[str, Any]]:
+        return await self.deletion_queue.get_progress(video_id)
+
+    async def run_job(self, job: Dict[str, Any], worker_id: str):
+        """Delete the video of a job claimed by a worker"""
+        video_id = job["_id"]
+
+        async def report(progress: int, message: str, **extra):
+            await self.deletion_queue.set_progress(
+                video_id,
+                {
+                    "status": "deleting",
+                    "progress": progress,
+                    "message": message,
+                    **extra,
+                },
+            )
+
+        # Stop processing first, so no frames are added while they are deleted. A worker
+        # processing the video can no longer renew its lease, and stops by the time it
+        # expires
+        processing_job = await self.job_queue.mark_deleted(video_id)
+        if (
+            processing_job is not None
+            and processing_job["status"] == "processing"
+            and processing_job["lease_expires_at"] is not None
+        ):
+            remaining = (
+                processing_job["lease_expires_at"] - datetime.utcnow()
+            ).total_seconds()
+            if remaining > 0:
+                await report(0, "Stopping video processing...")
+                await asyncio.sleep(remaining + 1)
+
+        total_frames = await self.mongodb_service.frame_collection.count_documents(
+            {"video_id": video_id}
+        )
+
+        async def frames_deleted(deleted: int):
+            await report(
+                int(90 * deleted / max(total_frames, deleted, 1)),
+                f"Deleting frames... {deleted}/{total_frames}",
+                frames_deleted=deleted,
+            )
+
+        await report(0, f"Deleting {total_frames} frames...", frames_deleted=0)
+        frame_count = await self.mongodb_service.cleanup_video_data(
+            video_id, progress_callback=frames_deleted
+        )
+        # Catch frames from an insert that was still in flight when processing stopped
+        frame_count += await self.mongodb_service.cleanup_video_data(video_id)
+
+        await report(90, "Removing files...", frames_deleted=frame_count)
+        await self.video_processor.cleanup_video_files(video_id)
+        invalidate_video_results(video_id)
+
+        await self.deletion_queue.set_progress(
+            video_id,
+            {
+                "status": "completed",
+                "progress": 100,
+                "message": f"Video deleted ({frame_count} frames)",
+                "frames_deleted": frame_count,
+            },
+        )
+        logger.info(f"Deleted video {video_id} ({frame_count} frames)")
+
+
+class RetentionSweeper:
+    """Queues videos older than a number of days for deletion.
+
+    With `retention_days` set, a sweep runs every `interval` seconds. Sweeps can also be
+    run on demand with any age. Each process may sweep; deletion jobs are keyed by video,
+    so videos found by several sweeps are only deleted once.
+
+    With `partial_upload_max_age` set, each run also removes chunked uploads in
+    `partial_upload_dir` that received no data for that many seconds.
+    """
+
+    def __init__(
+        self,
+        deleter: VideoDeleter,
+        retention_days: float = 0,
+        interval: float = 3600,
+        partial_upload_dir: Optional[Path] = None,
+        partial_upload_max_age: float = 0,
+    ):
+        self.deleter = deleter
+        self.retention_days = retention_days
+        self.interval = interval
+        self.partial_upload_dir = partial_upload_dir
+        self.partial_upload_max_age = partial_upload_max_age
+        self.last_sweep: Optional[Dict[str, Any]] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self.retention_days > 0 or self.partial_upload_max_age > 0:
+            self._task = asyncio.create_task(self._run())
+        if self.retention_days > 0:
+            logger.info(
+                f"Deleting videos older than {self.retention_days} days "
+                f"every {self.interval} seconds"
+            )
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self):
+        while True:
+            if self.retention_days > 0:
+                try:
+                    await self.sweep(self.retention_days)
+                except Exception as e:
+                    logger.error(f"Retention sweep failed: {e}")
+            if self.partial_upload_max_age > 0:
+                try:
+                    await asyncio.to_thread(self.expire_partial_uploads)
+                except Exception as e:
+                    logger.error(f"Expiring partial uploads failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    def expire_partial_uploads(self) -> List[str]:
+        """Remove abandoned chunked uploads. Returns their upload ids"""
+        if self.partial_upload_dir is None or not self.partial_upload_dir.exists():
+            return []
+        cutoff = time.time() - self.partial_upload_max_age
+        upload_ids = {
+            path.stem
+            for pattern in ("*.part", "*.json")
+            for path in self.partial_upload_dir.glob(pattern)
+        }
+        expired = []
+        for upload_id in upload_ids:
+            paths = [
+                self.partial_upload_dir / f"{upload_id}{suffix}"
+                for suffix in (".part", ".json")
+            ]
+            # Each chunk appended to the .part file updates its modification time
+            modified = []
+            for path in paths:
+                try:
+                    modified.append(path.stat().st_mtime)
+                except FileNotFoundError:
+                    pass
+            if modified and max(modified) < cutoff:
+                for path in paths:
+                    path.unlink(missing_ok=True)
+                expired.append(upload_id)
+        if expired:
+            logger.info(f"Removed {len(expired)} abandoned partial uploads")
+        return expired
+
+    async def sweep(self, older_than_days: float) -> Dict[str, Any]:
+        """Queue every video created more than older_than_days ago for deletion"""
+        started_at = datetime.utcnow()
+        cutoff = started_at - timedelta(days=older_than_days)
+        video_ids = await self.deleter.mongodb_service.get_video_ids_created_before(
+            cutoff
+        )
+        # Videos that failed processing never got metadata, only a failed job
+        failed_jobs = await self.deleter.job_queue.collection.find(
+            {"status": "failed", "created_at": {"$lt": cutoff}}, {"_id": 1}
+        ).to_list()
+        video_ids = list(dict.fromkeys(video_ids + [job["_id"] for job in failed_jobs]))
+
+        queued = 0
+        for video_id in video_ids:
+            if await self.deleter.request(video_id):
+                queued += 1
+
+        self.last_sweep = {
+            "started_at": started_at,
+            "older_than_days": older_than_days,
+            "cutoff": cutoff,
+            "video_ids": video_ids,
+            "queued": queued,
+        }
+        logger.info(
+            f"Retention sweep found {len(video_ids)} videos created before {cutoff}, "
+            f"queued {queued} for deletion"
+        )
+        return await self.status()
+
+    async def status(self) -> Optional[Dict[str, Any]]:
+        """The last sweep in this process, with the state of its deletion jobs"""
+        if self.last_sweep is None:
+            return None
+        video_ids: List[str] = self.last_sweep["video_ids"]
+        jobs = await self.deleter.deletion_queue.collection.aggregate(
+            [
+                {"$match": {"_id": {"$in": video_ids}}},
+                {"$group": {"_id": "$status", "count": {"$sum": 1}}},
+            ]
+        )
+        jobs_by_status = {job["_id"]: job["count"] async for job in jobs}
+        return {
+            **{k: v for k, v in self.last_sweep.items() if k != "video_ids"},
+            "videos_found": len(video_ids),
+            "jobs": jobs_by_status,
+            "deleted": jobs_by_status.get("completed", 0),
+            "remaining": len(video_ids) - jobs_by_status.get("completed", 0),
+        }
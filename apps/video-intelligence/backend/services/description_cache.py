@@ -0,0 +1,91 @@
+import hashlib
+import logging
+import os
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from .mongodb_service import mongodb_service
+from .search_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+
+class DescriptionCache:
+    """Frame descriptions keyed by a hash of the image they describe.
+
+    Recently used descriptions are kept in memory in front of a MongoDB collection, so
+    re-ingesting a video, or another video with identical frames, reuses descriptions
+    across restarts. Keys include a namespace identifying the model and prompt, so
+    changing either doesn't serve stale descriptions.
+    """
+
+    def __init__(
+        self,
+        mongodb_service,
+        max_entries: int = 10000,
+        ttl_seconds: float = 86400,
+        persist: bool = True,
+    ):
+        self.mongodb_service = mongodb_service
+        self.memory = TTLCache(max_entries=max_entries, ttl_seconds=ttl_seconds)
+        self.persist = persist
+        self.persistent_hits = 0
+
+    @staticmethod
+    def key(image_bytes: bytes, namespace: str = "") -> str:
+        return hashlib.sha256(namespace.encode() + b"\0" + image_bytes).hexdigest()
+
+    @property
+    def collection(self):
+        if not self.persist or self.mongodb_service.db is None:
+            return None
+        return self.mongodb_service.db[
+            self.mongodb_service.DESCRIPTION_CACHE_COLLECTION
+        ]
+
+    async def get(self, key: str) -> Optional[str]:
+        description = self.memory.get(key)
+        if description is not None or self.collection is None:
+            return description
+        try:
+            doc = await self.collection.find_one({"_id": key}, {"description": 1})
+        except Exception as e:
+            logger.warning(f"Failed to look up cached frame description: {e}")
+            return None
+        if doc is None:
+            return None
+        self.persistent_hits += 1
+        self.memory.put(key, doc["description"])
+        return doc["description"]
+
+    async def put(self, key: str, description: str):
+        self.memory.put(key, description)
+        if self.collection is None:
+            return
+        try:
+            await self.collection.update_one(
+                {"_id": key},
+                {
+                    "$set": {"description": description},
+                    "$setOnInsert": {"created_at": datetime.utcnow()},
+                },
+                upsert=True,
+            )
+        except Exception as e:
+            logger.warning(f"Failed to cache frame description: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.memory.stats(),
+            "persistent": self.collection is not None,
+            "persistent_hits": self.persistent_hits,
+        }
+
+
+# sha256(image) -> GPT-4o description
+description_cache = DescriptionCache(
+    mongodb_service,
+    max_entries=int(os.getenv("DESCRIPTION_CACHE_SIZE", "10000")),
+    ttl_seconds=float(os.getenv("DESCRIPTION_CACHE_TTL_SECONDS", "86400")),
+    persist=os.getenv("DESCRIPTION_CACHE_PERSIST", "true").lower() == "true",
+)
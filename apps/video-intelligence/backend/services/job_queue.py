@@ -0,0 +1,356 @@
+import asyncio
+import logging
+import os
+import socket
+import time
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+logger = logging.getLogger(__name__)
+
+
+class JobQueue:
+    """Persistent video processing queue stored in MongoDB.
+
+    Each job is a document keyed by video ID. A worker claims a job by taking a lease on
+    it, which it renews while processing. Jobs whose lease expires, because their worker
+    crashed or was stopped, are claimed again by the next free worker.
+    """
+
+    def __init__(
+        self,
+        mongodb_service,
+        collection_name: Optional[str] = None,
+        waiting_message: str = "Waiting for a processing worker...",
+    ):
+        self.mongodb_service = mongodb_service
+        # Defaults to the video processing job collection
+        self.collection_name = collection_name or mongodb_service.JOB_COLLECTION
+        self.waiting_message = waiting_message
+        self.lease_seconds = float(os.getenv("JOB_LEASE_SECONDS", "60"))
+        self.max_attempts = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+        self._job_available: Optional[asyncio.Event] = None
+
+    @property
+    def job_available(self) -> asyncio.Event:
+        """Set when a job is queued in this process, so idle workers start right away"""
+        # Created on first use so it belongs to the running event loop
+        if self._job_available is None:
+            self._job_available = asyncio.Event()
+        return self._job_available
+
+    @property
+    def collection(self):
+        return self.mongodb_service.db[self.collection_name]
+
+    async def ensure_indexes(self):
+        await self.collection.create_index(
+            [("status", 1), ("lease_expires_at", 1), ("created_at", 1)]
+        )
+
+    async def enqueue(self, video_id: str) -> bool:
+        """Queue a video for processing. Returns False if it already has a job"""
+        now = datetime.utcnow()
+        try:
+            await self.collection.insert_one(
+                {
+                    "_id": video_id,
+                    "status": "queued",
+                    "attempts": 0,
+                    "worker_id": None,
+                    "lease_expires_at": None,
+                    "progress": {
+                        "status": "processing",
+                        "progress": 0,
+                        "message": self.waiting_message,
+                    },
+                    "error": None,
+                    "created_at": now,
+                    "updated_at": now,
+                }
+            )
+        except DuplicateKeyError:
+            return False
+        logger.info(f"Queued {self.collection_name} job for video {video_id}")
+        self.job_available.set()
+        return True
+
+    async def claim(self, worker_id: str) -> Optional[Dict[str, Any]]:
+        """Lease the oldest queued job, or one whose lease has expired"""
+        now = datetime.utcnow()
+        # A job whose lease expired on its last attempt may be what brought its worker
+        # down (running out of memory, say), so it fails rather than being claimed again
+        error = f"Worker stopped responding after {self.max_attempts} attempts"
+        await self.collection.update_many(
+            {
+                "status": "processing",
+                "lease_expires_at": {"$lt": now},
+                "attempts": {"$gte": self.max_attempts},
+            },
+            {
+                "$set": {
+                    "status": "failed",
+                    "lease_expires_at": None,
+                    "error": error,
+                    "progress": {"status": "failed", "progress": 0, "message": error},
+                    "updated_at": now,
+                }
+            },
+        )
+        return await self.collection.find_one_and_update(
+            {
+                "$or": [
+                    {"status": "queued"},
+                    {
+                        "status": "processing",
+                        "lease_expires_at": {"$lt": now},
+                        "attempts": {"$lt": self.max_attempts},
+                    },
+                ]
+            },
+            {
+                "$set": {
+                    "status": "processing",
+                    "worker_id": worker_id,
+                    "lease_expires_at": now + timedelta(seconds=self.lease_seconds),
+                    "updated_at": now,
+                },
+                "$inc": {"attempts": 1},
+            },
+            sort=[("created_at", 1)],
+            return_document=ReturnDocument.AFTER,
+        )
+
+    async def renew(self, video_id: str, worker_id: str) -> bool:
+        """Extend a lease. Returns False if the job was claimed by another worker"""
+        now = datetime.utcnow()
+        result = await self.collection.update_one(
+            {"_id": video_id, "worker_id": worker_id, "status": "processing"},
+            {
+                "$set": {
+                    "lease_expires_at": now + timedelta(seconds=self.lease_seconds),
+                    "updated_at": now,
+                }
+            },
+        )
+        return result.matched_count == 1
+
+    async def complete(self, video_id: str, worker_id: str):
+        await self.collection.update_one(
+            {"_id": video_id, "worker_id": worker_id, "status": "processing"},
+            {
+                "$set": {
+                    "status": "completed",
+                    "lease_expires_at": None,
+                    "updated_at": datetime.utcnow(),
+                }
+            },
+        )
+
+    async def fail(self, job: Dict[str, Any], worker_id: str, error: str) -> bool:
+        """Record a failed attempt. Returns True if the job will be retried"""
+        retry = job["attempts"] < self.max_attempts
+        await self.collection.update_one(
+            {"_id": job["_id"], "worker_id": worker_id, "status": "processing"},
+            {
+                "$set": {
+                    "status": "queued" if retry else "failed",
+                    "lease_expires_at": None,
+                    "error": error,
+                    "updated_at": datetime.utcnow(),
+                }
+            },
+        )
+        if retry:
+            self.job_available.set()
+        return retry
+
+    async def retry(self, video_id: str) -> bool:
+        """Queue a failed job again with fresh attempts. Returns False if it hasn't failed"""
+        result = await self.collection.update_one(
+            {"_id": video_id, "status": "failed"},
+            {
+                "$set": {
+                    "status": "queued",
+                    "attempts": 0,
+                    "error": None,
+                    "updated_at": datetime.utcnow(),
+                }
+            },
+        )
+        if result.modified_count:
+            self.job_available.set()
+        return result.modified_count == 1
+
+    async def set_progress(self, video_id: str, progress: Dict[str, Any]):
+        await self.collection.update_one(
+            {"_id": video_id}, {"$set": {"progress": progress}}
+        )
+
+    async def get_progress(self, video_id: str) -> Optional[Dict[str, Any]]:
+        job = await self.collection.find_one({"_id": video_id}, {"progress": 1})
+        return job.get("progress") if job else None
+
+    async def mark_deleted(self, video_id: str) -> Optional[Dict[str, Any]]:
+        """Stop a video's job for good, returning it as it was.
+
+        The job is kept as a tombstone with status "deleted" rather than removed, so the
+        video can't be queued again while its files are being deleted.
+        """
+        now = datetime.utcnow()
+        return await self.collection.find_one_and_update(
+            {"_id": video_id},
+            {
+                "$set": {
+                    "status": "deleted",
+                    "lease_expires_at": None,
+                    "progress": {
+                        "status": "deleted",
+                        "progress": 0,
+                        "message": "Video deleted",
+                    },
+                    "updated_at": now,
+                },
+                "$setOnInsert": {"attempts": 0, "created_at": now},
+            },
+            upsert=True,
+            return_document=ReturnDocument.BEFORE,
+        )
+
+
+class ProgressBroker:
+    """Fans out processing progress to every subscriber of a video in this process.
+
+    The latest message of each video being processed is kept, so subscribers that join
+    late start from the current state.
+    """
+
+    def __init__(self, queue_size: int = 100):
+        self.queue_size = queue_size
+        self.subscribers: Dict[str, Set[asyncio.Queue]] = {}
+        self.latest_progress: Dict[str, Dict[str, Any]] = {}
+
+    def subscribe(self, video_id: str) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self.subscribers.setdefault(video_id, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, video_id: str, queue: asyncio.Queue):
+        queues = self.subscribers.get(video_id)
+        if queues is not None:
+            queues.discard(queue)
+            if not queues:
+                del self.subscribers[video_id]
+
+    def latest(self, video_id: str) -> Optional[Dict[str, Any]]:
+        return self.latest_progress.get(video_id)
+
+    def publish(self, video_id: str, data: Dict[str, Any]):
+        if data.get("status") in ("completed", "failed"):
+            # Finished videos are looked up from their job instead
+            self.latest_progress.pop(video_id, None)
+        else:
+            self.latest_progress[video_id] = data
+        for queue in self.subscribers.get(video_id, ()):
+            if queue.full():
+                # Only the most recent progress matters to a slow subscriber
+                queue.get_nowait()
+            queue.put_nowait(data)
+
+
+class JobWorkerPool:
+    """Workers that claim jobs from a JobQueue and run them, at most `concurrency` at once"""
+
+    def __init__(
+        self,
+        job_queue: JobQueue,
+        handler: Callable[[Dict[str, Any], str], Awaitable[None]],
+        concurrency: int = 2,
+        poll_interval: float = 5.0,
+    ):
+        self.job_queue = job_queue
+        self.handler = handler
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.worker_prefix = f"{socket.gethostname()}:{os.getpid()}"
+        self._workers = []
+
+    def start(self):
+        self._workers = [
+            asyncio.create_task(self._run(f"{self.worker_prefix}:{i}"))
+            for i in range(self.concurrency)
+        ]
+        logger.info(
+            f"Started {self.concurrency} workers for {self.job_queue.collection_name}"
+        )
+
+    async def stop(self):
+        # Interrupted jobs keep their lease until it expires, then get resumed
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    async def _run(self, worker_id: str):
+        while True:
+            try:
+                job = await self.job_queue.claim(worker_id)
+            except Exception as e:
+                logger.error(f"Worker {worker_id} failed to claim a job: {e}")
+                job = None
+
+            if job is None:
+                self.job_queue.job_available.clear()
+                try:
+                    await asyncio.wait_for(
+                        self.job_queue.job_available.wait(), self.poll_interval
+                    )
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            await self._process(job, worker_id)
+
+    async def _process(self, job: Dict[str, Any], worker_id: str):
+        video_id = job["_id"]
+        logger.info(
+            f"Worker {worker_id} processing video {video_id} (attempt {job['attempts']})"
+        )
+        task = asyncio.create_task(self.handler(job, worker_id))
+        renew_interval = self.job_queue.lease_seconds / 3
+        lease_expires = time.monotonic() + self.job_queue.lease_seconds
+        try:
+            while True:
+                done, _ = await asyncio.wait({task}, timeout=renew_interval)
+                if done:
+                    break
+                renew_started = time.monotonic()
+                try:
+                    renewed = await self.job_queue.renew(video_id, worker_id)
+                except Exception as e:
+                    logger.warning(f"Failed to renew lease on video {video_id}: {e}")
+                    # Keep going while the lease is valid, but stop once it runs out,
+                    # since the job may have been claimed or deleted in the meantime
+                    renewed = time.monotonic() + renew_interval < lease_expires
+                else:
+                    lease_expires = renew_started + self.job_queue.lease_seconds
+                if not renewed:
+                    logger.warning(
+                        f"Worker {worker_id} lost the lease on video {video_id}"
+                    )
+                    task.cancel()
+                    return
+            task.result()
+            await self.job_queue.complete(video_id, worker_id)
+        except asyncio.CancelledError:
+            task.cancel()
+            raise
+        except Exception as e:
+            logger.error(f"Processing video {video_id} failed: {e}")
+            try:
+                await self.job_queue.fail(job, worker_id, str(e))
+            except Exception as fail_error:
+                logger.error(f"Failed to record job failure: {fail_error}")
@@ -0,0 +1,351 @@
+import asyncio
+import logging
+import math
+import os
+import re
+import time
+import weakref
+from collections import Counter, defaultdict
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Fields returned with search results, matching the Atlas search projections
+RESULT_FIELDS = (
+    "frame_number",
+    "timestamp",
+    "description",
+    "file_path",
+    "thumbnail_path",
+    "metadata",
+)
+
+# BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Rank constant used by $rankFusion
+RANK_FUSION_CONSTANT = 60
+
+
+def tokenize(text: str) -> List[str]:
+    return re.findall(r"\w+", text.lower())
+
+
+class LocalVideoIndex:
+    """Vector and BM25 index over the frames of one video"""
+
+    def __init__(self, video_id: str, dimensions: int):
+        self.video_id = video_id
+        self.frames: List[Dict[str, Any]] = []
+        self.embeddings = np.empty((0, dimensions), dtype=np.float32)
+        # Inverted index of term -> [(frame position, term frequency)]
+        self.postings: Dict[str, List[tuple]] = defaultdict(list)
+        self.doc_lengths: List[int] = []
+        # None until the index holds every frame of the video in the database
+        self.loaded_at: Optional[float] = time.monotonic()
+
+    def add(self, frames: List[Dict[str, Any]]):
+        embeddings = []
+        for frame in frames:
+            position = len(self.frames)
+            self.frames.append(
+                {
+                    "video_id": self.video_id,
+                    **{field: frame.get(field) for field in RESULT_FIELDS},
+                }
+            )
+            embedding = frame.get("embedding")
+            if not embedding or len(embedding) != self.dimensions:
+                embedding = [0.0] * self.dimensions
+            embeddings.append(embedding)
+
+            terms = Counter(tokenize(frame.get("description") or ""))
+            for term, count in terms.items():
+                self.postings[term].append((position, count))
+            self.doc_lengths.append(sum(terms.values()))
+
+        if embeddings:
+            matrix = np.asarray(embeddings, dtype=np.float32)
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            matrix /= np.where(norms == 0, 1, norms)
+            self.embeddings = np.vstack([self.embeddings, matrix])
+
+    @property
+    def dimensions(self) -> int:
+        return self.embeddings.shape[1]
+
+
+class LocalSearchIndex:
+    """In-process search over frames, used when Atlas Search indexes are unavailable.
+
+    Each video's frames are loaded from the frame collection on first search and kept in
+    sync with frames inserted or deleted through MongoDBService. Videos are reloaded after
+    `refresh_seconds` to pick up frames written by other processes.
+
+    Scores follow Atlas: vector scores are (1 + cosine) / 2, text scores are BM25, and
+    hybrid results are combined with reciprocal rank fusion like $rankFusion.
+    """
+
+    def __init__(self, mongodb_service, refresh_seconds: Optional[float] = None):
+        self.mongodb_service = mongodb_service
+        self.refresh_seconds = (
+            refresh_seconds
+            if refresh_seconds is not None
+            else float(os.getenv("LOCAL_SEARCH_REFRESH_SECONDS", "60"))
+        )
+        self.videos: Dict[str, LocalVideoIndex] = {}
+        # IDs of every video with frames, for searches across all videos
+        self.video_ids: set = set()
+        self.video_ids_loaded_at: Optional[float] = None
+        # Per-video load locks, kept only while in use
+        self._locks: weakref.WeakValueDictionary[str, asyncio.Lock] = (
+            weakref.WeakValueDictionary()
+        )
+        # Frames inserted while a video is being loaded, added once the load finishes
+        self._inserted_while_loading: Dict[str, List[Dict[str, Any]]] = {}
+
+    def _is_stale(self, loaded_at: Optional[float]) -> bool:
+        return loaded_at is None or time.monotonic() - loaded_at > self.refresh_seconds
+
+    def _lock(self, video_id: str) -> asyncio.Lock:
+        lock = self._locks.get(video_id)
+        if lock is None:
+            lock = self._locks[video_id] = asyncio.Lock()
+        return lock
+
+    async def _load_video(self, video_id: str) -> LocalVideoIndex:
+        async with self._lock(video_id):
+            index = self.videos.get(video_id)
+            if index is not None and not self._is_stale(index.loaded_at):
+                return index
+
+            inserted = self._inserted_while_loading.setdefault(video_id, [])
+            try:
+                frames = await (
+                    self.mongodb_service.frame_collection.find(
+                        {"video_id": video_id},
+                        {"_id": 0, "embedding": 1, **dict.fromkeys(RESULT_FIELDS, 1)},
+                    )
+                    .sort("frame_number", 1)
+                    .to_list()
+                )
+            finally:
+                self._inserted_while_loading.pop(video_id, None)
+            # Frames inserted during the query may or may not have been read by it
+            loaded = {frame.get("frame_number") for frame in frames}
+            frames += [
+                frame for frame in inserted if frame.get("frame_number") not in loaded
+            ]
+
+            index = LocalVideoIndex(video_id, self.mongodb_service.EMBEDDING_DIM_SIZE)
+            index.add(frames)
+            if not frames:
+                # Unknown videos aren't kept, so arbitrary filters can't grow the index
+                self.videos.pop(video_id, None)
+                return index
+            self.videos[video_id] = index
+            logger.info(f"Loaded {len(frames)} frames of video {video_id} for search")
+            return index
+
+    async def _get_indexes(self, video_filter: Optional[str]) -> List[LocalVideoIndex]:
+        if video_filter:
+            video_ids = [video_filter]
+        else:
+            if self._is_stale(self.video_ids_loaded_at):
+                self.video_ids = set(
+                    await self.mongodb_service.frame_collection.distinct("video_id")
+                )
+                # Drop videos deleted by other processes
+                for video_id in set(self.videos) - self.video_ids:
+                    self.videos.pop(video_id, None)
+                self.video_ids_loaded_at = time.monotonic()
+            video_ids = self.video_ids | set(self.videos)
+        return [await self._load_video(video_id) for video_id in video_ids]
+
+    def add_frames(self, video_id: str, frames: List[Dict[str, Any]]):
+        """Add newly inserted frames to a video that is already loaded"""
+        if video_id in self._inserted_while_loading:
+            self._inserted_while_loading[video_id].extend(frames)
+        index = self.videos.get(video_id)
+        if index is not None:
+            index.add(frames)
+        elif self.video_ids_loaded_at is not None:
+            # A video not seen yet, which makes it searchable right away. It may be a
+            # resumed video with frames saved earlier, so it is stale until loaded in full
+            index = LocalVideoIndex(video_id, self.mongodb_service.EMBEDDING_DIM_SIZE)
+            index.add(frames)
+            index.loaded_at = None
+            self.videos[video_id] = index
+
+    def remove_video(self, video_id: str):
+        self.videos.pop(video_id, None)
+        self.video_ids.discard(video_id)
+        self._locks.pop(video_id, None)
+
+    async def semantic_search(
+        self,
+        query_embedding: List[float],
+        top_k: int = 5,
+        video_filter: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        query = np.asarray(query_embedding, dtype=np.float32)
+        if query.shape != (self.mongodb_service.EMBEDDING_DIM_SIZE,):
+            logger.warning(
+                f"Query embedding has {query.size} dimensions, expected "
+                f"{self.mongodb_service.EMBEDDING_DIM_SIZE}; returning no results"
+            )
+            return []
+        norm = np.linalg.norm(query)
+        if norm == 0:
+            return []
+        query /= norm
+
+        candidates = []
+        for index in await self._get_indexes(video_filter):
+            if not index.frames:
+                continue
+            scores = index.embeddings @ query
+            k = min(top_k, len(scores))
+            top = np.argpartition(-scores, k - 1)[:k]
+            candidates.extend((float(scores[i]), index, int(i)) for i in top)
+
+        candidates.sort(key=lambda candidate: candidate[0], reverse=True)
+        return [
+            {**index.frames[i], "similarity_score": (1 + score) / 2}
+            for score, index, i in candidates[:top_k]
+        ]
+
+    async def segment_search(
+        self,
+        query_embedding: List[float],
+        top_k: int = 10,
+        frame_limit: int = 100,
+        max_gap: float = 5.0,
+        segments_per_video: int = 3,
+        video_filter: Optional[str] = None,
+        score_margin: float = 0.05,
+    ) -> List[Dict[str, Any]]:
+        """Group the best frame_limit frames into segments, like MongoDBService.segment_search"""
+        hits = await self.semantic_search(query_embedding, frame_limit, video_filter)
+        if not hits:
+            return []
+        hits_by_video = defaultdict(list)
+        for hit in hits:
+            hits_by_video[hit["video_id"]].append(hit)
+
+        segments = []
+        for video_id, hits in hits_by_video.items():
+            # Drop hits much weaker than the video's best
+            min_score = max(hit["similarity_score"] for hit in hits) - score_margin
+            hits = [hit for hit in hits if hit["similarity_score"] >= min_score]
+            hits.sort(key=lambda hit: hit["timestamp"])
+            groups = []
+            for hit in hits:
+                if groups and hit["timestamp"] - groups[-1][-1]["timestamp"] <= max_gap:
+                    groups[-1].append(hit)
+                else:
+                    groups.append([hit])
+
+            video_segments = []
+            for group in groups:
+                best = max(group, key=lambda hit: hit["similarity_score"])
+                video_segments.append(
+                    {
+                        "video_id": video_id,
+                        "start_time": group[0]["timestamp"],
+                        "end_time": group[-1]["timestamp"],
+                        "frame_count": len(group),
+                        "similarity_score": best["similarity_score"],
+                        "average_score": sum(hit["similarity_score"] for hit in group)
+                        / len(group),
+                        "best_frame": {
+                            key: value
+                            for key, value in best.items()
+                            if key != "video_id"
+                        },
+                    }
+                )
+            video_segments.sort(
+                key=lambda segment: segment["similarity_score"], reverse=True
+            )
+            if segments_per_video > 0:
+                video_segments = video_segments[:segments_per_video]
+            segments.extend(video_segments)
+
+        segments.sort(key=lambda segment: segment["similarity_score"], reverse=True)
+        return segments[:top_k]
+
+    async def text_search(
+        self, query_text: str, top_k: int = 5, video_filter: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        indexes = await self._get_indexes(video_filter)
+        terms = set(tokenize(query_text))
+        frame_count = sum(len(index.frames) for index in indexes)
+        if not terms or not frame_count:
+            return []
+
+        average_length = (
+            sum(sum(index.doc_lengths) for index in indexes) / frame_count or 1
+        )
+        idf = {}
+        for term in terms:
+            doc_freq = sum(len(index.postings.get(term, ())) for index in indexes)
+            idf[term] = math.log(1 + (frame_count - doc_freq + 0.5) / (doc_freq + 0.5))
+
+        candidates = []
+        for index in indexes:
+            scores = defaultdict(float)
+            for term in terms:
+                for position, count in index.postings.get(term, ()):
+                    length_norm = (
+                        1
+                        - BM25_B
+                        + BM25_B * (index.doc_lengths[position] / average_length)
+                    )
+                    scores[position] += (
+                        idf[term]
+                        * count
+                        * (BM25_K1 + 1)
+                        / (count + BM25_K1 * length_norm)
+                    )
+            candidates.extend((score, index, i) for i, score in scores.items())
+
+        candidates.sort(key=lambda candidate: candidate[0], reverse=True)
+        return [
+            {**index.frames[i], "similarity_score": score}
+            for score, index, i in candidates[:top_k]
+        ]
+
+    async def hybrid_search(
+        self,
+        query_text: str,
+        query_embedding: List[float],
+        top_k: int = 5,
+        vector_weight: float = 0.5,
+        text_weight: float = 0.5,
+        video_filter: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        vector_results = await self.semantic_search(
+            query_embedding, top_k, video_filter
+        )
+        text_results = await self.text_search(query_text, top_k, video_filter)
+
+        fused = {}
+        for results, weight in (
+            (vector_results, vector_weight),
+            (text_results, text_weight),
+        ):
+            for rank, result in enumerate(results):
+                key = (result["video_id"], result["frame_number"])
+                score = weight / (RANK_FUSION_CONSTANT + rank + 1)
+                if key in fused:
+                    fused[key]["similarity_score"] += score
+                else:
+                    fused[key] = {**result, "similarity_score": score}
+
+        return sorted(
+            fused.values(), key=lambda result: result["similarity_score"], reverse=True
+        )[:top_k]
@@ -0,0 +1,81 @@
+import time
+from contextlib import contextmanager
+from typing import Awaitable, Dict, Optional, TypeVar
+
+from prometheus_client import CONTENT_TYPE_LATEST, Histogram, generate_latest
+
+T = TypeVar("T")
+
+# Buckets from 1ms to 2 minutes, covering both cache hits and GPT-4o calls
+LATENCY_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+    120.0,
+)
+
+SEARCH_SECONDS = Histogram(
+    "video_search_seconds",
+    "Total time to handle a search request",
+    ["search_type", "cached"],
+    buckets=LATENCY_BUCKETS,
+)
+SEARCH_STAGE_SECONDS = Histogram(
+    "video_search_stage_seconds",
+    "Time spent in each stage of a search request",
+    ["search_type", "stage"],
+    buckets=LATENCY_BUCKETS,
+)
+DATABASE_OPERATION_SECONDS = Histogram(
+    "video_database_operation_seconds",
+    "Time spent running each kind of database query, including the local fallbacks",
+    ["operation"],
+    buckets=LATENCY_BUCKETS,
+)
+INGEST_STAGE_SECONDS = Histogram(
+    "video_ingest_stage_seconds",
+    "Time spent per frame in each ingestion stage (per batch for inserts)",
+    ["stage"],
+    buckets=LATENCY_BUCKETS,
+)
+
+
+@contextmanager
+def timed(histogram: Histogram, spans: Optional[Dict[str, float]] = None, **labels):
+    """Observe the duration of the block in histogram.
+
+    If spans is given, the duration in milliseconds is also added to spans under the
+    "stage" (or "operation") label, for logging.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        histogram.labels(**labels).observe(elapsed)
+        if spans is not None:
+            name = labels.get("stage") or labels.get("operation")
+            spans[name] = spans.get(name, 0.0) + elapsed * 1000
+
+
+async def timed_await(histogram: Histogram, awaitable: Awaitable[T], **labels) -> T:
+    """Await awaitable, observing how long it took in histogram"""
+    with timed(histogram, **labels):
+        return await awaitable
+
+
+def render_metrics():
+    """Metrics in the Prometheus text format, and their content type"""
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -1,27 +1,37 @@
+import asyncio
 import logging
 import os
 import time
 from datetime import datetime
-from typing import Any, Dict, List, Optional
+from typing import Any, Awaitable, Callable, Dict, List, Optional
 
-from pymongo import MongoClient
-from pymongo.collection import Collection
-from pymongo.database import Database
+from pymongo import AsyncMongoClient
+from pymongo.asynchronous.collection import AsyncCollection
+from pymongo.asynchronous.database import AsyncDatabase
 from pymongo.operations import SearchIndexModel
 
+from .local_search import LocalSearchIndex
+from .metrics import DATABASE_OPERATION_SECONDS, timed, timed_await
+
 logger = logging.getLogger(__name__)
 
 
 class MongoDBService:
     def __init__(self):
-        self.client: Optional[MongoClient] = None
-        self.db: Optional[Database] = None
-        self.frame_collection: Optional[Collection] = None
-        self.video_collection: Optional[Collection] = None
+        self.client: Optional[AsyncMongoClient] = None
+        self.db: Optional[AsyncDatabase] = None
+        self.frame_collection: Optional[AsyncCollection] = None
+        self.video_collection: Optional[AsyncCollection] = None
+
+        # Background tasks (e.g. index readiness polling) kept alive until they finish
+        self._background_tasks = set()
 
         # Collection names
         self.FRAME_COLLECTION = "frame_intelligence"
         self.VIDEO_COLLECTION = "video_metadata"
+        self.JOB_COLLECTION = "processing_jobs"
+        self.DELETION_JOB_COLLECTION = "deletion_jobs"
+        self.DESCRIPTION_CACHE_COLLECTION = "frame_descriptions"
 
         # Get embedding dimensions from environment variable
         self.EMBEDDING_DIM_SIZE = int(os.getenv("EMBEDDING_DIM_SIZE", "1024"))
@@ -29,6 +39,34 @@ class MongoDBService:
             f"MongoDB service initialized with embedding dimensions: {self.EMBEDDING_DIM_SIZE}"
         )
 
+        # Vector search recall/latency settings. ANN searches consider top_k times this
+        # many candidates; searches within a video of at most EXACT_SEARCH_MAX_FRAMES
+        # frames compare against every frame instead
+        self.NUM_CANDIDATES_MULTIPLIER = int(
+            os.getenv("VECTOR_NUM_CANDIDATES_MULTIPLIER", "15")
+        )
+        self.EXACT_SEARCH_MAX_FRAMES = int(os.getenv("EXACT_SEARCH_MAX_FRAMES", "2000"))
+
+        # Segment search settings. Matching frames of a video at most
+        # SEGMENT_MAX_GAP_SECONDS apart are merged into one segment, from a pool of
+        # SEGMENT_FRAMES_PER_SEGMENT frames per requested segment (at most
+        # SEGMENT_MAX_FRAMES) scoring within SEGMENT_SCORE_MARGIN of the best frame of
+        # their video, keeping the best SEGMENTS_PER_VIDEO segments of each video
+        self.SEGMENT_MAX_GAP_SECONDS = float(os.getenv("SEGMENT_MAX_GAP_SECONDS", "5"))
+        self.SEGMENT_FRAMES_PER_SEGMENT = int(
+            os.getenv("SEGMENT_FRAMES_PER_SEGMENT", "10")
+        )
+        self.SEGMENT_MAX_FRAMES = int(os.getenv("SEGMENT_MAX_FRAMES", "500"))
+        self.SEGMENT_SCORE_MARGIN = float(os.getenv("SEGMENT_SCORE_MARGIN", "0.05"))
+        self.SEGMENTS_PER_VIDEO = int(os.getenv("SEGMENTS_PER_VIDEO", "3"))
+
+        # Frames removed per delete, so deleting a long video doesn't hold one huge
+        # operation open
+        self.DELETE_BATCH_SIZE = int(os.getenv("DELETE_BATCH_SIZE", "1000"))
+
+        # Serves searches when Atlas Search indexes are missing, e.g. on a local MongoDB
+        self.local_index = LocalSearchIndex(self)
+
     async def connect(self):
         """Connect to MongoDB Atlas"""
         try:
@@ -38,11 +76,21 @@ class MongoDBService:
             if not mongodb_uri:
                 raise ValueError("MONGODB_URI environment variable not set")
 
-            self.client = MongoClient(mongodb_uri)
+            # Connection pool sized for concurrent searches and frame batch inserts
+            self.client = AsyncMongoClient(
+                mongodb_uri,
+                maxPoolSize=int(os.getenv("MONGODB_MAX_POOL_SIZE", "100")),
+                minPoolSize=int(os.getenv("MONGODB_MIN_POOL_SIZE", "5")),
+                maxIdleTimeMS=int(os.getenv("MONGODB_MAX_IDLE_TIME_MS", "300000")),
+                maxConnecting=int(os.getenv("MONGODB_MAX_CONNECTING", "4")),
+                waitQueueTimeoutMS=int(
+                    os.getenv("MONGODB_WAIT_QUEUE_TIMEOUT_MS", "10000")
+                ),
+            )
             self.db = self.client[database_name]
 
             # Test connection
-            self.client.admin.command("ping")
+            await self.client.admin.command("ping")
             logger.info(f"Connected to MongoDB database: {database_name}")
 
             # Ensure database and collections exist
@@ -63,7 +111,7 @@ class MongoDBService:
         """Ensure database and collections exist"""
         try:
             # List existing databases
-            database_names = self.client.list_database_names()
+            database_names = await self.client.list_database_names()
             database_name = self.db.name
 
             if database_name not in database_names:
@@ -72,14 +120,14 @@ class MongoDBService:
                 )
 
             # List existing collections in the database
-            existing_collections = self.db.list_collection_names()
+            existing_collections = await self.db.list_collection_names()
 
             # Ensure frame collection exists
             if self.FRAME_COLLECTION not in existing_collections:
                 logger.info(f"Creating collection '{self.FRAME_COLLECTION}'")
                 # Create collection with a dummy document, then remove it
-                self.db[self.FRAME_COLLECTION].insert_one({"_temp": "init"})
-                self.db[self.FRAME_COLLECTION].delete_one({"_temp": "init"})
+                await self.db[self.FRAME_COLLECTION].insert_one({"_temp": "init"})
+                await self.db[self.FRAME_COLLECTION].delete_one({"_temp": "init"})
                 logger.info(f"Collection '{self.FRAME_COLLECTION}' created")
             else:
                 logger.info(f"Collection '{self.FRAME_COLLECTION}' already exists")
@@ -88,8 +136,8 @@ class MongoDBService:
             if self.VIDEO_COLLECTION not in existing_collections:
                 logger.info(f"Creating collection '{self.VIDEO_COLLECTION}'")
                 # Create collection with a dummy document, then remove it
-                self.db[self.VIDEO_COLLECTION].insert_one({"_temp": "init"})
-                self.db[self.VIDEO_COLLECTION].delete_one({"_temp": "init"})
+                await self.db[self.VIDEO_COLLECTION].insert_one({"_temp": "init"})
+                await self.db[self.VIDEO_COLLECTION].delete_one({"_temp": "init"})
                 logger.info(f"Collection '{self.VIDEO_COLLECTION}' created")
             else:
                 logger.info(f"Collection '{self.VIDEO_COLLECTION}' already exists")
@@ -108,8 +156,21 @@ class MongoDBService:
                 )
                 return
 
+            # Used by per-video lookups, deletes and exact search frame counts
+            await self.frame_collection.create_index("video_id")
+            # Used by retention sweeps
+            await self.video_collection.create_index("created_at")
+            # One metadata document per video, even if a retried job saves it again
+            try:
+                await self.video_collection.create_index("video_id", unique=True)
+            except Exception as e:
+                logger.warning(
+                    f"Could not create unique video_id index, check for duplicate "
+                    f"video metadata: {e}"
+                )
+
             # Create vector search index
-            self.create_vector_search_index(
+            await self.create_vector_search_index(
                 self.frame_collection,
                 "vector_search_index",
                 dimensions=self.EMBEDDING_DIM_SIZE,
@@ -117,7 +178,9 @@ class MongoDBService:
             )
 
             # Create text search index
-            self.create_text_search_index(self.frame_collection, "text_search_index")
+            await self.create_text_search_index(
+                self.frame_collection, "text_search_index"
+            )
 
             logger.info("Database indexes setup completed")
 
@@ -127,7 +190,7 @@ class MongoDBService:
                 "The application will continue to work, but search performance may be reduced"
             )
 
-    def create_vector_search_index(
+    async def create_vector_search_index(
         self,
         collection,
         vector_index_name,
@@ -143,7 +206,7 @@ class MongoDBService:
         logger.info(f"Creating vector search index with {dimensions} dimensions")
         try:
             # Check if index already exists
-            existing_indexes = list(collection.list_search_indexes())
+            existing_indexes = await (await collection.list_search_indexes()).to_list()
             for index in existing_indexes:
                 if index["name"] == vector_index_name:
                     logger.info(
@@ -179,13 +242,13 @@ class MongoDBService:
 
         try:
             # Check if collection exists first
-            if collection.name not in self.db.list_collection_names():
+            if collection.name not in await self.db.list_collection_names():
                 logger.warning(
                     f"Collection '{collection.name}' does not exist, cannot create vector search index"
                 )
                 return
 
-            result = collection.create_search_index(model=search_index_model)
+            result = await collection.create_search_index(model=search_index_model)
             logger.info(f"New vector search index '{result}' is building.")
 
             # Wait for index to be ready (non-blocking)
@@ -203,11 +266,11 @@ class MongoDBService:
                 logger.error(f"Error creating vector search index: {e}")
             return
 
-    def create_text_search_index(self, collection, text_index_name):
+    async def create_text_search_index(self, collection, text_index_name):
         """Create text search index if it doesn't exist"""
         try:
             # Check if index already exists
-            existing_indexes = list(collection.list_search_indexes())
+            existing_indexes = await (await collection.list_search_indexes()).to_list()
             for index in existing_indexes:
                 if index["name"] == text_index_name:
                     logger.info(
@@ -238,13 +301,13 @@ class MongoDBService:
 
         try:
             # Check if collection exists first
-            if collection.name not in self.db.list_collection_names():
+            if collection.name not in await self.db.list_collection_names():
                 logger.warning(
                     f"Collection '{collection.name}' does not exist, cannot create text search index"
                 )
                 return
 
-            result = collection.create_search_index(model=search_index_model)
+            result = await collection.create_search_index(model=search_index_model)
             logger.info(f"New text search index '{result}' is building.")
 
         except Exception as e:
@@ -262,29 +325,28 @@ class MongoDBService:
     def _wait_for_index_ready(self, collection, index_name, timeout=300):
         """Wait for index to be ready (runs in background)"""
 
-        def check_index():
+        async def check_index():
             start_time = time.time()
             logger.info(f"Polling to check if index '{index_name}' is ready...")
 
             while time.time() - start_time < timeout:
                 try:
-                    indices = list(collection.list_search_indexes(index_name))
+                    cursor = await collection.list_search_indexes(index_name)
+                    indices = await cursor.to_list()
                     if indices and indices[0].get("queryable") is True:
                         logger.info(f"✅ Index '{index_name}' is ready for querying!")
                         return
-                    time.sleep(10)  # Check every 10 seconds
+                    await asyncio.sleep(10)  # Check every 10 seconds
                 except Exception as e:
                     logger.warning(f"Error checking index readiness: {e}")
-                    time.sleep(10)
+                    await asyncio.sleep(10)
 
             logger.warning(f"⏰ Timeout waiting for index '{index_name}' to be ready")
 
         # Run index checking in background (don't block startup)
-        import threading
-
-        thread = threading.Thread(target=check_index)
-        thread.daemon = True
-        thread.start()
+        task = asyncio.create_task(check_index())
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
 
     async def insert_frame_batch(
         self, video_id: str, frame_batch: List[Dict[str, Any]]
@@ -299,51 +361,105 @@ class MongoDBService:
                 frame["video_id"] = video_id
                 frame["created_at"] = datetime.utcnow()
 
-            result = self.frame_collection.insert_many(frame_batch)
+            result = await self.frame_collection.insert_many(frame_batch)
             logger.info(
                 f"Inserted batch of {len(result.inserted_ids)} frames for video {video_id}"
             )
+            self.local_index.add_frames(video_id, frame_batch)
             return result.inserted_ids
 
         except Exception as e:
             logger.error(f"Failed to insert frame batch: {e}")
             raise
 
+    async def get_saved_frame_numbers(self, video_id: str) -> set:
+        """Get the numbers of frames already saved for a video"""
+        return set(
+            await self.frame_collection.distinct("frame_number", {"video_id": video_id})
+        )
+
     async def insert_video_metadata(self, video_metadata: Dict[str, Any]):
-        """Insert video metadata"""
+        """Insert video metadata, or update it if a previous attempt already saved it"""
         try:
-            video_metadata["created_at"] = datetime.utcnow()
-            result = self.video_collection.insert_one(video_metadata)
-            logger.info(f"Inserted video metadata with ID: {result.inserted_id}")
-            return str(result.inserted_id)
+            result = await self.video_collection.update_one(
+                {"video_id": video_metadata["video_id"]},
+                {
+                    "$set": video_metadata,
+                    "$setOnInsert": {"created_at": datetime.utcnow()},
+                },
+                upsert=True,
+            )
+            if result.upserted_id is not None:
+                logger.info(f"Inserted video metadata with ID: {result.upserted_id}")
+                return str(result.upserted_id)
+            logger.info(f"Updated video metadata of video {video_metadata['video_id']}")
 
         except Exception as e:
             logger.error(f"Failed to insert video metadata: {e}")
             raise
 
+    async def use_exact_search(self, video_filter: Optional[str]) -> bool:
+        """Whether searching the frames of video_filter exhaustively is cheap enough"""
+        if not video_filter or self.EXACT_SEARCH_MAX_FRAMES <= 0:
+            return False
+        frame_count = await self.frame_collection.count_documents(
+            {"video_id": video_filter}, limit=self.EXACT_SEARCH_MAX_FRAMES + 1
+        )
+        return frame_count <= self.EXACT_SEARCH_MAX_FRAMES
+
+    def vector_search_stage(
+        self,
+        query_embedding: List[float],
+        top_k: int,
+        video_filter: Optional[str] = None,
+        exact: bool = False,
+        num_candidates_multiplier: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """Build a $vectorSearch stage, filtering by video only when one is given"""
+        vector_search = {
+            "index": "vector_search_index",
+            "path": "embedding",
+            "queryVector": query_embedding,
+            "limit": top_k,
+        }
+        if exact:
+            vector_search["exact"] = True
+        else:
+            multiplier = num_candidates_multiplier or self.NUM_CANDIDATES_MULTIPLIER
+            # Atlas allows at most 10000 candidates
+            vector_search["numCandidates"] = min(10000, max(top_k, top_k * multiplier))
+        if video_filter:
+            vector_search["filter"] = {"video_id": video_filter}
+        return {"$vectorSearch": vector_search}
+
     async def semantic_search(
         self,
         query_embedding: List[float],
         top_k: int = 5,
         video_filter: Optional[str] = None,
+        exact: Optional[bool] = None,
+        num_candidates_multiplier: Optional[int] = None,
     ) -> List[Dict[str, Any]]:
-        """Perform semantic search using vector similarity"""
+        """Perform semantic search using vector similarity.
+
+        exact forces exhaustive (True) or approximate (False) search. By default small
+        single-video searches are exact.
+        """
 
         print(
             f"Performing semantic search with query embedding: {len(query_embedding)}"
         )
         try:
+            if exact is None:
+                exact = await self.use_exact_search(video_filter)
             pipeline = [
-                {
-                    "$vectorSearch": {
-                        "index": "vector_search_index",
-                        "path": "embedding",
-                        "queryVector": query_embedding,
-                        "numCandidates": top_k * 2,
-                        "filter": {"video_id": video_filter},
-                        "limit": top_k,
-                    }
-                }
+                self.vector_search_stage(
+                    query_embedding,
+                    top_k,
+                    video_filter,
+                    exact,
+                    num_candidates_multiplier,
+                )
             ]
 
             pipeline.append(
@@ -353,6 +469,7 @@ class MongoDBService:
                         "timestamp": 1,
                         "description": 1,
                         "file_path": 1,
+                        "thumbnail_path": 1,
                         "metadata": 1,
                         "video_id": 1,
                         "similarity_score": {"$meta": "vectorSearchScore"},
@@ -361,23 +478,234 @@ class MongoDBService:
                 }
             )
 
-            results = list(self.frame_collection.aggregate(pipeline))
+            with timed(DATABASE_OPERATION_SECONDS, operation="semantic_search"):
+                cursor = await self.frame_collection.aggregate(pipeline)
+                results = await cursor.to_list()
             logger.info(f"Found {len(results)} semantic search results")
             return results
 
         except Exception as e:
-            error_msg = str(e).lower()
-            if "index not found" in error_msg or "no search index" in error_msg:
+            if self._is_search_unavailable(e):
                 logger.error(
                     "Vector search index 'vector_search_index' not found. Please create it in MongoDB Atlas."
                 )
                 logger.error("See README.md for setup instructions.")
-                # Fall back to basic text search or return empty results
-                return await self._fallback_text_search(top_k)
+                # Fall back to searching an in-process index
+                return await timed_await(
+                    DATABASE_OPERATION_SECONDS,
+                    self.local_index.semantic_search(
+                        query_embedding, top_k, video_filter
+                    ),
+                    operation="local_semantic_search",
+                )
             else:
                 logger.error(f"Semantic search failed: {e}")
                 return []
 
+    async def segment_search(
+        self,
+        query_embedding: List[float],
+        top_k: int = 10,
+        video_filter: Optional[str] = None,
+        max_gap: Optional[float] = None,
+        segments_per_video: Optional[int] = None,
+        exact: Optional[bool] = None,
+        num_candidates_multiplier: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """Find the video segments that best match a query embedding.
+
+        The best matching frames, scoring within SEGMENT_SCORE_MARGIN of the best one,
+        are grouped by video and merged into segments wherever consecutive hits are at
+        most max_gap seconds apart. Segments are scored by their best frame, and at most
+        segments_per_video are returned per video (0 for no limit).
+        """
+        max_gap = self.SEGMENT_MAX_GAP_SECONDS if max_gap is None else max_gap
+        if segments_per_video is None:
+            segments_per_video = self.SEGMENTS_PER_VIDEO
+        frame_limit = min(
+            self.SEGMENT_MAX_FRAMES, max(top_k, top_k * self.SEGMENT_FRAMES_PER_SEGMENT)
+        )
+        try:
+            if exact is None:
+                exact = await self.use_exact_search(video_filter)
+            pipeline = [
+                self.vector_search_stage(
+                    query_embedding,
+                    frame_limit,
+                    video_filter,
+                    exact,
+                    num_candidates_multiplier,
+                ),
+                {
+                    "$project": {
+                        "frame_number": 1,
+                        "timestamp": 1,
+                        "description": 1,
+                        "file_path": 1,
+                        "thumbnail_path": 1,
+                        "metadata": 1,
+                        "video_id": 1,
+                        "similarity_score": {"$meta": "vectorSearchScore"},
+                        "_id": 0,
+                    }
+                },
+                # Drop hits much weaker than their video's best, which would otherwise
+                # bridge unrelated scenes
+                {
+                    "$setWindowFields": {
+                        "partitionBy": "$video_id",
+                        "output": {"best_score": {"$max": "$similarity_score"}},
+                    }
+                },
+                {
+                    "$match": {
+                        "$expr": {
+                            "$gte": [
+                                "$similarity_score",
+                                {
+                                    "$subtract": [
+                                        "$best_score",
+                                        self.SEGMENT_SCORE_MARGIN,
+                                    ]
+                                },
+                            ]
+                        }
+                    }
+                },
+                # A segment starts at each video's first hit and after every gap
+                # longer than max_gap
+                {
+                    "$setWindowFields": {
+                        "partitionBy": "$video_id",
+                        "sortBy": {"timestamp": 1},
+                        "output": {
+                            "previous_timestamp": {
+                                "$shift": {"output": "$timestamp", "by": -1}
+                            }
+                        },
+                    }
+                },
+                {
+                    "$set": {
+                        "segment_start": {
+                            "$cond": [
+                                {
+                                    "$or": [
+                                        {"$eq": ["$previous_timestamp", None]},
+                                        {
+                                            "$gt": [
+                                                {
+                                                    "$subtract": [
+                                                        "$timestamp",
+                                                        "$previous_timestamp",
+                                                    ]
+                                                },
+                                                max_gap,
+                                            ]
+                                        },
+                                    ]
+                                },
+                                1,
+                                0,
+                            ]
+                        }
+                    }
+                },
+                # Number segments within each video by counting the starts so far
+                {
+                    "$setWindowFields": {
+                        "partitionBy": "$video_id",
+                        "sortBy": {"timestamp": 1},
+                        "output": {
+                            "segment": {
+                                "$sum": "$segment_start",
+                                "window": {"documents": ["unbounded", "current"]},
+                            }
+                        },
+                    }
+                },
+                {
+                    "$group": {
+                        "_id": {"video_id": "$video_id", "segment": "$segment"},
+                        "start_time": {"$min": "$timestamp"},
+                        "end_time": {"$max": "$timestamp"},
+                        "frame_count": {"$sum": 1},
+                        "similarity_score": {"$max": "$similarity_score"},
+                        "average_score": {"$avg": "$similarity_score"},
+                        "best_frame": {
+                            "$top": {
+                                "sortBy": {"similarity_score": -1},
+                                "output": {
+                                    "frame_number": "$frame_number",
+                                    "timestamp": "$timestamp",
+                                    "description": "$description",
+                                    "file_path": "$file_path",
+                                    "thumbnail_path": "$thumbnail_path",
+                                    "metadata": "$metadata",
+                                    "similarity_score": "$similarity_score",
+                                },
+                            }
+                        },
+                    }
+                },
+            ]
+            if segments_per_video > 0:
+                pipeline += [
+                    {
+                        "$setWindowFields": {
+                            "partitionBy": "$_id.video_id",
+                            "sortBy": {"similarity_score": -1},
+                            "output": {"video_rank": {"$documentNumber": {}}},
+                        }
+                    },
+                    {"$match": {"video_rank": {"$lte": segments_per_video}}},
+                ]
+            pipeline += [
+                {"$sort": {"similarity_score": -1}},
+                {"$limit": top_k},
+                {
+                    "$project": {
+                        "_id": 0,
+                        "video_id": "$_id.video_id",
+                        "start_time": 1,
+                        "end_time": 1,
+                        "frame_count": 1,
+                        "similarity_score": 1,
+                        "average_score": 1,
+                        "best_frame": 1,
+                    }
+                },
+            ]
+
+            with timed(DATABASE_OPERATION_SECONDS, operation="segment_search"):
+                cursor = await self.frame_collection.aggregate(pipeline)
+                results = await cursor.to_list()
+            logger.info(
+                f"Found {len(results)} segments from up to {frame_limit} frames"
+            )
+            return results
+
+        except Exception as e:
+            if self._is_search_unavailable(e):
+                logger.warning(
+                    f"Segment search unavailable, falling back to local search: {e}"
+                )
+                return await timed_await(
+                    DATABASE_OPERATION_SECONDS,
+                    self.local_index.segment_search(
+                        query_embedding,
+                        top_k,
+                        frame_limit,
+                        max_gap,
+                        segments_per_video,
+                        video_filter,
+                        self.SEGMENT_SCORE_MARGIN,
+                    ),
+                    operation="local_segment_search",
+                )
+            logger.error(f"Segment search failed: {e}")
+            return []
+
     async def text_search(
         self, query_text: str, top_k: int = 5, video_filter: Optional[str] = None
     ) -> List[Dict[str, Any]]:
@@ -409,6 +737,7 @@ class MongoDBService:
                             "timestamp": 1,
                             "description": 1,
                             "file_path": 1,
+                            "thumbnail_path": 1,
                             "metadata": 1,
                             "video_id": 1,
                             "similarity_score": {"$meta": "searchScore"},
@@ -418,67 +747,39 @@ class MongoDBService:
                 ]
             )
 
-            results = list(self.frame_collection.aggregate(pipeline))
+            with timed(DATABASE_OPERATION_SECONDS, operation="text_search"):
+                cursor = await self.frame_collection.aggregate(pipeline)
+                results = await cursor.to_list()
             logger.info(f"Found {len(results)} text search results")
             return results
 
         except Exception as e:
-            error_msg = str(e).lower()
-            if "index not found" in error_msg or "no search index" in error_msg:
+            if self._is_search_unavailable(e):
                 logger.warning(
-                    "Text search index 'text_search_index' not found. Falling back to basic text matching."
+                    "Text search index 'text_search_index' not found. Falling back to local BM25 search."
                 )
-                return await self._fallback_basic_text_search(
-                    query_text, top_k, video_filter
+                return await timed_await(
+                    DATABASE_OPERATION_SECONDS,
+                    self.local_index.text_search(query_text, top_k, video_filter),
+                    operation="local_text_search",
                 )
             else:
                 logger.error(f"Text search failed: {e}")
                 return []
 
-    async def _fallback_basic_text_search(
-        self, query_text: str, top_k: int = 5, video_filter: Optional[str] = None
-    ) -> List[Dict[str, Any]]:
-        """Fallback text search using MongoDB regex when text search index is not available"""
-        try:
-            # Build basic text search using regex
-            match_filter = {
-                "description": {
-                    "$regex": query_text,
-                    "$options": "i",
-                }  # case-insensitive
-            }
-
-            # Add video filter if specified
-            if video_filter:
-                match_filter["video_id"] = video_filter
-
-            results = list(
-                self.frame_collection.find(
-                    match_filter,
-                    {
-                        "_id": 0,
-                        "frame_number": 1,
-                        "timestamp": 1,
-                        "description": 1,
-                        "file_path": 1,
-                        "metadata": 1,
-                        "video_id": 1,
-                    },
-                )
-                .sort("timestamp", 1)
-                .limit(top_k)
+    def _is_search_unavailable(self, error: Exception) -> bool:
+        """Whether a search failed because Atlas Search isn't available or set up"""
+        error_msg = str(error).lower()
+        return any(
+            reason in error_msg
+            for reason in (
+                "index not found",
+                "no search index",
+                "unrecognized pipeline stage",
+                "only available on atlas",
+                "requires additional configuration",
             )
-
-            # Add dummy similarity scores based on position
-            for i, result in enumerate(results):
-                result["similarity_score"] = 1.0 - (i * 0.1)  # Decreasing score
-
-            logger.info(f"Fallback text search returned {len(results)} results")
-            return results
-
-        except Exception as e:
-            logger.error(f"Fallback text search failed: {e}")
-            return []
+        )
 
     async def hybrid_search(
         self,
@@ -488,21 +789,22 @@ class MongoDBService:
         vector_weight: float = 0.5,
         text_weight: float = 0.5,
         video_filter: Optional[str] = None,
+        exact: Optional[bool] = None,
+        num_candidates_multiplier: Optional[int] = None,
     ) -> List[Dict[str, Any]]:
         """Perform hybrid search combining text and vector search"""
         try:
+            if exact is None:
+                exact = await self.use_exact_search(video_filter)
             # Build vector search pipeline - match individual semantic search exactly
             vector_pipeline = [
-                {
-                    "$vectorSearch": {
-                        "index": "vector_search_index",
-                        "path": "embedding",
-                        "queryVector": query_embedding,
-                        "numCandidates": top_k * 2,
-                        "filter": {"video_id": video_filter},
-                        "limit": top_k,
-                    }
-                }
+                self.vector_search_stage(
+                    query_embedding,
+                    top_k,
+                    video_filter,
+                    exact,
+                    num_candidates_multiplier,
+                )
             ]
 
             # Build text search pipeline - match individual text search exactly
@@ -549,6 +851,7 @@ class MongoDBService:
                         "timestamp": 1,
                         "description": 1,
                         "file_path": 1,
+                        "thumbnail_path": 1,
                         "metadata": 1,
                         "video_id": 1,
                         "similarity_score": 1,
@@ -557,15 +860,39 @@ class MongoDBService:
                 },
             ]
 
-            results = list(self.frame_collection.aggregate(pipeline))
+            with timed(DATABASE_OPERATION_SECONDS, operation="hybrid_search"):
+                cursor = await self.frame_collection.aggregate(pipeline)
+                results = await cursor.to_list()
             logger.info(f"Found {len(results)} hybrid search results")
             return results
 
         except Exception as e:
+            if self._is_search_unavailable(e):
+                logger.warning(
+                    f"Hybrid search unavailable, falling back to local search: {e}"
+                )
+                return await timed_await(
+                    DATABASE_OPERATION_SECONDS,
+                    self.local_index.hybrid_search(
+                        query_text,
+                        query_embedding,
+                        top_k,
+                        vector_weight,
+                        text_weight,
+                        video_filter,
+                    ),
+                    operation="local_hybrid_search",
+                )
             logger.warning(
                 f"Hybrid search failed, falling back to semantic search: {e}"
             )
-            return await self.semantic_search(query_embedding, top_k, video_filter)
+            return await self.semantic_search(
+                query_embedding,
+                top_k,
+                video_filter,
+                exact,
+                num_candidates_multiplier,
+            )
 
     async def get_all_videos(self) -> List[Dict[str, Any]]:
         """Get all uploaded videos"""
@@ -587,7 +914,7 @@ class MongoDBService:
                 },
             ).sort("created_at", -1)
 
-            results = list(cursor)
+            results = await cursor.to_list()
             logger.info(f"Found {len(results)} uploaded videos")
             return results
         except Exception as e:
@@ -597,63 +924,78 @@ class MongoDBService:
     async def get_video_metadata(self, video_id: str) -> Optional[Dict[str, Any]]:
         """Get video metadata by ID"""
         try:
-            result = self.video_collection.find_one({"video_id": video_id})
+            result = await self.video_collection.find_one({"video_id": video_id})
             return result
         except Exception as e:
             logger.error(f"Failed to get video metadata: {e}")
             return None
 
-    async def cleanup_video_data(self, video_id: str):
-        """Clean up all data for a video"""
-        try:
-            # Delete frame data
-            frame_result = self.frame_collection.delete_many({"video_id": video_id})
-            # Delete video metadata
-            video_result = self.video_collection.delete_many({"video_id": video_id})
+    async def mark_video_deleting(self, video_id: str):
+        """Hide a video from the video list while it is deleted"""
+        await self.video_collection.update_many(
+            {"video_id": video_id}, {"$set": {"status": "deleting"}}
+        )
 
-            logger.info(
-                f"Cleaned up video {video_id}: {frame_result.deleted_count} frames, {video_result.deleted_count} metadata records"
-            )
+    async def get_video_ids_created_before(self, cutoff: datetime) -> List[str]:
+        """IDs of videos whose metadata was created before cutoff"""
+        videos = await self.video_collection.find(
+            {"created_at": {"$lt": cutoff}},
+            {"_id": 0, "video_id": 1},
+        ).to_list()
+        return [video["video_id"] for video in videos]
 
-        except Exception as e:
-            logger.error(f"Failed to cleanup video data: {e}")
+    async def delete_frames_in_batches(
+        self,
+        video_id: str,
+        progress_callback: Optional[Callable[[int], Awaitable[None]]] = None,
+    ) -> int:
+        """Delete a video's frames DELETE_BATCH_SIZE at a time, returning the count"""
+        deleted = 0
+        while True:
+            batch = await (
+                self.frame_collection.find({"video_id": video_id}, {"_id": 1})
+                .limit(self.DELETE_BATCH_SIZE)
+                .to_list()
+            )
+            if not batch:
+                return deleted
+            result = await self.frame_collection.delete_many(
+                {"_id": {"$in": [frame["_id"] for frame in batch]}}
+            )
+            deleted += result.deleted_count
+            if progress_callback:
+                await progress_callback(deleted)
 
-    async def _fallback_text_search(self, top_k: int = 5) -> List[Dict[str, Any]]:
-        """Fallback to basic MongoDB query when vector search is not available"""
+    async def cleanup_video_data(
+        self,
+        video_id: str,
+        progress_callback: Optional[Callable[[int], Awaitable[None]]] = None,
+    ) -> int:
+        """Clean up all data for a video, returning the number of frames deleted"""
         try:
-            # Simple fallback: return recent frames
-            results = list(
-                self.frame_collection.find(
-                    {},
-                    {
-                        "_id": 0,
-                        "frame_number": 1,
-                        "timestamp": 1,
-                        "description": 1,
-                        "file_path": 1,
-                        "metadata": 1,
-                        "video_id": 1,
-                    },
-                )
-                .sort("timestamp", 1)
-                .limit(top_k)
+            # Delete frame data
+            frame_count = await self.delete_frames_in_batches(
+                video_id, progress_callback
+            )
+            self.local_index.remove_video(video_id)
+            # Delete video metadata last, so the video stays hidden until its frames are gone
+            video_result = await self.video_collection.delete_many(
+                {"video_id": video_id}
             )
 
-            # Add dummy similarity scores
-            for result in results:
-                result["similarity_score"] = 0.5
-
-            logger.info(f"Fallback search returned {len(results)} results")
-            return results
+            logger.info(
+                f"Cleaned up video {video_id}: {frame_count} frames, {video_result.deleted_count} metadata records"
+            )
+            return frame_count
 
         except Exception as e:
-            logger.error(f"Fallback search failed: {e}")
-            return []
+            logger.error(f"Failed to cleanup video data: {e}")
+            raise
 
     async def disconnect(self):
         """Close MongoDB connection"""
         if self.client:
-            self.client.close()
+            await self.client.close()
             logger.info("Disconnected from MongoDB")
 
 
@@ -0,0 +1,96 @@
+import asyncio
+import logging
+from typing import Any, Callable, Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class RequestBatcher:
+    """Coalesce concurrent API requests into batched calls.
+
+    Requests in the same group (e.g. an embedding input type) are collected until
+    `max_batch_size` are waiting or the oldest has waited `max_wait` seconds, then sent as
+    a single call to `batch_fn`, which takes a list of inputs and the group and returns
+    one result per input. `batch_fn` is blocking and runs in the default thread pool.
+    Batches that fail are retried in halves, down to single inputs.
+    """
+
+    def __init__(
+        self,
+        batch_fn: Callable[[List[Any], str], List[Any]],
+        max_batch_size: int = 16,
+        max_wait: float = 0.05,
+        name: str = "request",
+    ):
+        self.batch_fn = batch_fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait
+        self.name = name
+        # Pending (input, future) pairs and the flush timer for each group
+        self._pending: Dict[str, List[Tuple[Any, asyncio.Future]]] = {}
+        self._timers: Dict[str, asyncio.TimerHandle] = {}
+        self._tasks = set()
+        self.batches_sent = 0
+        self.inputs_sent = 0
+
+    async def submit(self, data: Any, group: str = "default") -> Any:
+        """Queue one input and wait for its result"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        pending = self._pending.setdefault(group, [])
+        pending.append((data, future))
+
+        if len(pending) >= self.max_batch_size:
+            self._flush(group)
+        elif group not in self._timers:
+            self._timers[group] = loop.call_later(self.max_wait, self._flush, group)
+        return await future
+
+    def _flush(self, group: str):
+        timer = self._timers.pop(group, None)
+        if timer is not None:
+            timer.cancel()
+        batch = self._pending.pop(group, [])
+        if batch:
+            # Keep a reference so the task isn't garbage collected while running
+            task = asyncio.get_running_loop().create_task(self._send(batch, group))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _send(self, batch: List[Tuple[Any, asyncio.Future]], group: str):
+        results = await self._call([data for data, _ in batch], group)
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                # The caller was cancelled
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    async def _call(self, inputs: List[Any], group: str) -> List[Any]:
+        """Results of batch_fn for inputs, with the exception in place of failed ones.
+
+        A failed batch is split in half and each half retried, so one bad input (an
+        unreadable image, say) only fails itself rather than everything batched with it.
+        """
+        self.batches_sent += 1
+        self.inputs_sent += len(inputs)
+        try:
+            results = await asyncio.to_thread(self.batch_fn, inputs, group)
+            if len(results) != len(inputs):
+                raise ValueError(f"Expected {len(inputs)} results, got {len(results)}")
+            return list(results)
+        except Exception as e:
+            if len(inputs) == 1:
+                logger.error(f"{self.name.capitalize()} request failed: {e}")
+                return [e]
+            logger.warning(
+                f"Batched {self.name} of {len(inputs)} inputs failed, "
+                f"retrying in halves: {e}"
+            )
+        middle = len(inputs) // 2
+        first, second = await asyncio.gather(
+            self._call(inputs[:middle], group), self._call(inputs[middle:], group)
+        )
+        return first + second
@@ -0,0 +1,80 @@
+import os
+import re
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+def normalize_query(text: str) -> str:
+    """Normalize query text so queries differing only in whitespace share cache entries.
+
+    Case is kept, since it changes query embeddings (names and acronyms, for example).
+    """
+    return re.sub(r"\s+", " ", text).strip()
+
+
+class TTLCache:
+    """LRU cache whose entries also expire after `ttl_seconds`"""
+
+    def __init__(self, max_entries: int = 1000, ttl_seconds: float = 3600):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        entry = self.entries.get(key)
+        if entry is None or time.monotonic() - entry[0] > self.ttl_seconds:
+            self.entries.pop(key, None)
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, key: Hashable, value: Any):
+        if self.max_entries <= 0:
+            return
+        self.entries[key] = (time.monotonic(), value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def invalidate(self, predicate: Optional[Callable[[Hashable], bool]] = None):
+        """Drop every entry whose key matches predicate, or everything if not given"""
+        if predicate is None:
+            self.entries.clear()
+            return
+        for key in [key for key in self.entries if predicate(key)]:
+            del self.entries[key]
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self.entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+# Query text -> embedding. Embeddings of a given text never change, so entries live long
+query_embedding_cache = TTLCache(
+    max_entries=int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", "1000")),
+    ttl_seconds=float(os.getenv("QUERY_EMBEDDING_CACHE_TTL_SECONDS", "3600")),
+)
+
+# (query, search_type, top_k, video_id) -> search results. Short lived, since frames are
+# added while videos are processed
+search_result_cache = TTLCache(
+    max_entries=int(os.getenv("SEARCH_RESULT_CACHE_SIZE", "500")),
+    ttl_seconds=float(os.getenv("SEARCH_RESULT_CACHE_TTL_SECONDS", "30")),
+)
+
+
+def invalidate_video_results(video_id: str):
+    """Drop cached results that may include frames of video_id"""
+    search_result_cache.invalidate(lambda key: key[3] is None or key[3] == video_id)
@@ -1,15 +1,66 @@
 import asyncio
 import logging
+import multiprocessing
 import os
 import shutil
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import Any, Callable, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
 
 import cv2
-from PIL import Image
+import numpy as np
+from PIL import Image, features
+
+from .metrics import INGEST_STAGE_SECONDS, timed, timed_await
+from .rate_limiter import TokenBucket
 
 logger = logging.getLogger(__name__)
 
+# Description stored when a frame's AI processing fails
+FALLBACK_DESCRIPTION = "Frame processing failed"
+
+# Thumbnail formats: file extension and Pillow save options
+THUMBNAIL_FORMATS = {
+    "webp": (".webp", {"format": "WEBP", "quality": 80, "method": 4}),
+    "avif": (".avif", {"format": "AVIF", "quality": 60}),
+    "jpeg": (".jpg", {"format": "JPEG", "quality": 85}),
+}
+
+
+def frame_signature(frame) -> Tuple[int, np.ndarray]:
+    """256-bit difference hash of a frame, and the frame as 32x32 grayscale.
+
+    Near-identical frames have hashes that differ in only a few bits, regardless of small
+    changes in compression, brightness or scale. The hash only captures gradients, so
+    flat frames (solid colours, mostly dark title cards) hash alike; comparing the small
+    grayscale images tells those apart.
+    """
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    small = cv2.resize(gray, (17, 16), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    frame_hash = int("".join("1" if bit else "0" for bit in bits), 2)
+    pixels = cv2.resize(gray, (32, 32), interpolation=cv2.INTER_AREA).astype(np.int16)
+    return frame_hash, pixels
+
+
+def frame_to_image(frame) -> Image.Image:
+    """Convert an OpenCV BGR frame to a PIL Image"""
+    return Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+
+
+def encode_frame(
+    frame, frame_path: str, thumbnail_path: str, thumbnail_format: str = "jpeg"
+):
+    """Write a frame as JPEG along with its thumbnail (runs in a worker process)"""
+    cv2.imwrite(frame_path, frame)
+
+    # Convert to PIL Image for processing
+    pil_image = frame_to_image(frame)
+
+    # Generate thumbnail (smaller version for UI)
+    pil_image.thumbnail((320, 240), Image.Resampling.LANCZOS)
+    pil_image.save(thumbnail_path, **THUMBNAIL_FORMATS[thumbnail_format][1])
+
 
 class VideoProcessor:
     def __init__(self):
@@ -20,6 +71,53 @@ class VideoProcessor:
         )
         self.frame_interval = float(os.getenv("FRAME_EXTRACTION_INTERVAL", "2.0"))
 
+        # How frames are sampled: "seek" jumps between sampled frames, "grab" skips
+        # unsampled frames with grab() (which still decodes them, only skipping the colour
+        # conversion), "scene" samples on scene changes and "decode" reads every frame
+        self.sampling_mode = os.getenv("FRAME_SAMPLING_MODE", "seek").lower()
+        if self.sampling_mode not in ("grab", "seek", "scene", "decode"):
+            raise ValueError(f"Unknown FRAME_SAMPLING_MODE: {self.sampling_mode}")
+        # Seeking decodes forward from the previous keyframe, so shorter gaps are skipped
+        # with grab()
+        self.seek_min_gap = int(os.getenv("FRAME_SEEK_MIN_GAP", "30"))
+        self.scene_check_interval = float(os.getenv("SCENE_CHECK_INTERVAL", "0.5"))
+        self.scene_threshold = float(os.getenv("SCENE_CHANGE_THRESHOLD", "0.3"))
+
+        # Frames whose perceptual hash is within this many bits (of 256) of the last
+        # distinct frame, and none of whose 32x32 grayscale pixels differ from it by more
+        # than dedup_pixel_threshold (of 255), reuse its description and embedding. The
+        # pixel check catches small changes such as a new line of text on a slide, which
+        # an average would dilute. A negative threshold disables deduplication
+        self.dedup_threshold = int(os.getenv("FRAME_DEDUP_THRESHOLD", "6"))
+        self.dedup_pixel_threshold = int(os.getenv("FRAME_DEDUP_PIXEL_THRESHOLD", "10"))
+
+        # Thumbnails are encoded once at ingestion in this format
+        self.thumbnail_format = os.getenv("THUMBNAIL_FORMAT", "webp").lower()
+        if self.thumbnail_format not in THUMBNAIL_FORMATS:
+            raise ValueError(f"Unknown THUMBNAIL_FORMAT: {self.thumbnail_format}")
+        if self.thumbnail_format != "jpeg" and not features.check(
+            self.thumbnail_format
+        ):
+            logger.warning(
+                f"Pillow can't encode {self.thumbnail_format}, using JPEG thumbnails"
+            )
+            self.thumbnail_format = "jpeg"
+
+        # Frame processing pipeline settings
+        self.queue_size = int(os.getenv("PIPELINE_QUEUE_SIZE", "16"))
+        self.encode_workers = int(
+            os.getenv("ENCODE_WORKERS", str(min(4, os.cpu_count() or 1)))
+        )
+        self.ai_concurrency = int(os.getenv("AI_CONCURRENCY", "5"))
+        self.write_batch_size = int(os.getenv("FRAME_BATCH_SIZE", "5"))
+        self.write_flush_interval = float(os.getenv("FRAME_BATCH_FLUSH_SECONDS", "5"))
+        # Frames per second sent to the description and embedding APIs
+        self.ai_rate_limiter = TokenBucket(
+            rate=float(os.getenv("AI_FRAMES_PER_SECOND", "5")),
+            capacity=float(os.getenv("AI_BURST_FRAMES", "5")),
+        )
+        self._encode_pool: Optional[ProcessPoolExecutor] = None
+
         # Ensure directories exist
         self.upload_dir.mkdir(parents=True, exist_ok=True)
         self.frames_dir.mkdir(parents=True, exist_ok=True)
@@ -32,9 +130,13 @@ class VideoProcessor:
         progress_callback: Optional[Callable] = None,
         mongodb_service=None,
         ai_service=None,
+        saved_frames: Optional[set] = None,
     ) -> Dict[str, Any]:
         """
         Process video: extract frames, generate descriptions and embeddings
+
+        saved_frames holds the numbers of frames already saved by an earlier, interrupted
+        run. They are extracted again but not sent to the AI services or saved twice.
         """
         try:
             video_path = Path(video_path)
@@ -73,12 +175,20 @@ class VideoProcessor:
                     }
                 )
 
-            # Copy video to frontend directory for playback
+            # Link video into frontend directory for playback. A hard link shares the
+            # upload's data instead of copying it
             frontend_video_path = (
                 self.frontend_videos_dir / f"{video_id}{video_path.suffix}"
             )
-            shutil.copy2(str(video_path), str(frontend_video_path))
-            logger.info(f"Copied video to frontend: {frontend_video_path}")
+            frontend_video_path.unlink(missing_ok=True)
+            try:
+                os.link(video_path, frontend_video_path)
+                linked = True
+                logger.info(f"Linked video to frontend: {frontend_video_path}")
+            except OSError as e:
+                # Likely on a different filesystem; move the file once frames are extracted
+                linked = False
+                logger.info(f"Unable to link video to frontend, will move it: {e}")
 
             # Update video metadata with frontend path
             video_metadata["frontend_path"] = f"/videos/{video_id}{video_path.suffix}"
@@ -88,18 +198,42 @@ class VideoProcessor:
                     {
                         "status": "processing",
                         "progress": 10,
-                        "message": "Video copied for playback, extracting frames...",
+                        "message": "Extracting frames...",
                         "total_frames": total_frames,
                     }
                 )
 
             # Extract frames with progressive ingestion
             frames_data = await self._extract_frames_with_progress(
-                cap, video_id, fps, progress_callback, mongodb_service, ai_service
+                cap,
+                video_id,
+                fps,
+                progress_callback,
+                mongodb_service,
+                ai_service,
+                saved_frames,
             )
 
             cap.release()
 
+            if not linked:
+                # The upload is deleted after processing, so it can be moved rather than
+                # copied
+                await asyncio.to_thread(
+                    shutil.move, str(video_path), str(frontend_video_path)
+                )
+                logger.info(f"Moved video to frontend: {frontend_video_path}")
+
+            # Each reused frame saves one description and one embedding call
+            duplicate_frames = sum(
+                1 for frame in frames_data if "duplicate_of" in frame
+            )
+            video_metadata["duplicate_frames"] = duplicate_frames
+            logger.info(
+                f"Reused AI results for {duplicate_frames} of {len(frames_data)} frames, "
+                f"saving {duplicate_frames * 2} API calls"
+            )
+
             if progress_callback:
                 await progress_callback(
                     {
@@ -107,6 +241,7 @@ class VideoProcessor:
                         "progress": 100,
                         "message": f"Processing complete! Extracted {len(frames_data)} frames",
                         "frames_processed": len(frames_data),
+                        "duplicate_frames": duplicate_frames,
                     }
                 )
 
@@ -136,19 +271,31 @@ class VideoProcessor:
         progress_callback: Optional[Callable] = None,
         mongodb_service=None,
         ai_service=None,
+        saved_frames: Optional[set] = None,
     ) -> List[Dict[str, Any]]:
-        """Extract frames from video with progress updates and progressive ingestion"""
-        frames_data = []
-        pending_frames = []  # Batch for progressive insertion
-        frame_interval_frames = int(fps * self.frame_interval)
-        current_frame = 0
-        extracted_frames = 0
-        BATCH_SIZE = 5  # Insert every 5 frames to preserve progress
+        """Extract frames from video with progress updates and progressive ingestion.
+
+        Frames flow through a staged pipeline connected by bounded queues, so decoding,
+        JPEG/thumbnail encoding, AI calls and database writes all overlap:
 
+        decode -> encode (process pool) -> description + embedding workers -> batched writer
+        """
+        frames_data = []
+        frame_interval_frames = max(1, int(fps * self.frame_interval))
         total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
 
+        # Scene sampling checks frames more often than the regular interval, and keeps
+        # those where the picture changed
+        scene_state = None
+        if self.sampling_mode == "scene":
+            scene_state = {
+                "check_frames": max(1, int(fps * self.scene_check_interval)),
+            }
+
         # Calculate maximum frames we can extract based on frame interval
-        max_possible_frames = total_frames // int(fps * self.frame_interval)
+        max_possible_frames = total_frames // (
+            scene_state["check_frames"] if scene_state else frame_interval_frames
+        )
 
         # Tip: When testing, set MAX_FRAMES_FOR_TESTING to limit extraction
         # Set to None or a large number to extract all available frames
@@ -156,60 +303,77 @@ class VideoProcessor:
 
         video_frames_dir = self.frames_dir / video_id
         video_frames_dir.mkdir(exist_ok=True)
-
-        while True:
-            ret, frame = cap.read()
-            if not ret:
-                break
-
-            # Stop after extracting MAX_FRAMES_FOR_TESTING frames (if limit is set)
-            if (
-                MAX_FRAMES_FOR_TESTING is not None
-                and extracted_frames >= MAX_FRAMES_FOR_TESTING
+        thumbnail_extension = THUMBNAIL_FORMATS[self.thumbnail_format][0]
+
+        with_ai = mongodb_service is not None and ai_service is not None
+        encode_queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        ai_queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        write_queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        loop = asyncio.get_running_loop()
+        encode_pool = self._get_encode_pool()
+        # Each distinct frame travels with a future for its AI results, which its
+        # duplicates travel with too and await. Only frames in flight keep them alive
+        reuse_tasks: Set[asyncio.Task] = set()
+
+        async def decode():
+            current_frame = 0
+            extracted_frames = 0
+            last_hash = None
+            last_pixels = None
+            last_frame_number = None
+            last_result: Optional[asyncio.Future] = None
+            while (
+                MAX_FRAMES_FOR_TESTING is None
+                or extracted_frames < MAX_FRAMES_FOR_TESTING
             ):
-                break
-
-            if current_frame % frame_interval_frames == 0:
-                timestamp = current_frame / fps
-                frame_filename = f"frame_{extracted_frames:06d}.jpg"
-                frame_path = video_frames_dir / frame_filename
-
-                # Save frame as image
-                cv2.imwrite(str(frame_path), frame)
-
-                # Convert to PIL Image for processing
-                frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                pil_image = Image.fromarray(frame_rgb)
-
-                # Generate thumbnail (smaller version for UI)
-                thumbnail = pil_image.copy()
-                thumbnail.thumbnail((320, 240), Image.Resampling.LANCZOS)
-                thumbnail_path = video_frames_dir / f"thumb_{extracted_frames:06d}.jpg"
-                thumbnail.save(thumbnail_path, "JPEG", quality=85)
+                # Decoding blocks, so read up to the next sampled frame in a worker thread
+                with timed(INGEST_STAGE_SECONDS, stage="decode"):
+                    sampled = await asyncio.to_thread(
+                        self._read_next_sampled_frame,
+                        cap,
+                        current_frame,
+                        frame_interval_frames,
+                        scene_state,
+                    )
+                if sampled is None:
+                    break
+                frame, frame_index = sampled
+                current_frame = frame_index + 1
 
                 frame_data = {
                     "frame_number": extracted_frames,
-                    "timestamp": timestamp,
-                    "file_path": str(frame_path),
-                    "thumbnail_path": str(thumbnail_path),
+                    "timestamp": frame_index / fps,
+                    "file_path": str(
+                        video_frames_dir / f"frame_{extracted_frames:06d}.jpg"
+                    ),
+                    "thumbnail_path": str(
+                        video_frames_dir
+                        / f"thumb_{extracted_frames:06d}{thumbnail_extension}"
+                    ),
                     "metadata": {
                         "width": frame.shape[1],
                         "height": frame.shape[0],
-                        "original_frame_number": current_frame,
+                        "original_frame_number": frame_index,
                     },
                 }
 
-                frames_data.append(frame_data)
-                pending_frames.append(frame_data.copy())  # Add to pending batch
+                frame_hash, pixels = frame_signature(frame)
+                frame_data["phash"] = f"{frame_hash:064x}"
+                if (
+                    last_hash is not None
+                    and bin(frame_hash ^ last_hash).count("1") <= self.dedup_threshold
+                    and np.abs(pixels - last_pixels).max() <= self.dedup_pixel_threshold
+                ):
+                    frame_data["duplicate_of"] = last_frame_number
+                else:
+                    last_hash = frame_hash
+                    last_pixels = pixels
+                    last_frame_number = extracted_frames
+                    last_result = loop.create_future() if with_ai else None
+
+                await encode_queue.put((frame, frame_data, last_result))
                 extracted_frames += 1
 
-                # Progressive insertion: save frames in batches to preserve progress
-                if mongodb_service and ai_service and len(pending_frames) >= BATCH_SIZE:
-                    await self._process_and_save_frame_batch(
-                        pending_frames, video_id, mongodb_service, ai_service
-                    )
-                    pending_frames.clear()
-
                 # Progress update after each frame extraction
                 if progress_callback:
                     progress = min(95, 10 + (current_frame / total_frames) * 80)
@@ -227,36 +391,244 @@ class VideoProcessor:
                         }
                     )
 
-            current_frame += 1
-
-            # Additional progress updates every 100 frames processed (even if not extracted)
-            if progress_callback and current_frame % 100 == 0:
-                progress = min(95, 10 + (current_frame / total_frames) * 80)
-                await progress_callback(
-                    {
-                        "status": "processing",
-                        "progress": int(progress),
-                        "message": f"Processing video... {extracted_frames} frames extracted so far",
-                        "frames_processed": extracted_frames,
-                    }
+        async def encode():
+            while (item := await encode_queue.get()) is not None:
+                frame, frame_data, result = item
+                # The frame's own results, unless it's a duplicate awaiting another's
+                own_result = None if "duplicate_of" in frame_data else result
+                try:
+                    with timed(INGEST_STAGE_SECONDS, stage="encode"):
+                        await loop.run_in_executor(
+                            encode_pool,
+                            encode_frame,
+                            frame,
+                            frame_data["file_path"],
+                            frame_data["thumbnail_path"],
+                            self.thumbnail_format,
+                        )
+                except Exception as e:
+                    logger.error(
+                        f"Failed to encode frame {frame_data['frame_number']}: {e}"
+                    )
+                    # Let duplicates of this frame fall back to their own AI calls
+                    if own_result is not None and not own_result.done():
+                        own_result.set_result(None)
+                    continue
+                frames_data.append(frame_data)
+                if not with_ai:
+                    continue
+                if saved_frames and frame_data["frame_number"] in saved_frames:
+                    # Saved before the run was interrupted. Its duplicates don't have its
+                    # results at hand, so they are processed on their own
+                    if own_result is not None and not own_result.done():
+                        own_result.set_result(None)
+                    continue
+                if "duplicate_of" in frame_data:
+                    # Waiting happens outside the AI workers, which may still have the
+                    # distinct frame queued behind this one
+                    task = asyncio.create_task(reuse(frame_data, result))
+                    reuse_tasks.add(task)
+                    task.add_done_callback(reuse_tasks.discard)
+                else:
+                    # Pass the decoded frame along so it isn't read back from disk
+                    await ai_queue.put((frame_data.copy(), frame, result))
+
+        async def enrich():
+            while (item := await ai_queue.get()) is not None:
+                frame_data, frame, result = item
+                image = await asyncio.to_thread(frame_to_image, frame)
+                with timed(INGEST_STAGE_SECONDS, stage="rate_limit_wait"):
+                    await self.ai_rate_limiter.acquire()
+                processed = await self._process_single_frame(
+                    frame_data, ai_service, image
+                )
+                if not result.done():
+                    result.set_result(processed)
+                await write_queue.put(processed)
+
+        async def reuse(frame_data, reference_result: asyncio.Future):
+            reference = await reference_result
+            if reference is None or reference["description"] == FALLBACK_DESCRIPTION:
+                del frame_data["duplicate_of"]
+                with timed(INGEST_STAGE_SECONDS, stage="rate_limit_wait"):
+                    await self.ai_rate_limiter.acquire()
+                processed = await self._process_single_frame(
+                    frame_data.copy(), ai_service
                 )
+            else:
+                processed = {
+                    **frame_data,
+                    "description": reference["description"],
+                    "embedding": reference["embedding"],
+                }
+            await write_queue.put(processed)
+
+        async def write():
+            pending_frames = []
+            done = False
+            while not done:
+                try:
+                    # Flush partial batches periodically so progress is preserved
+                    frame = await asyncio.wait_for(
+                        write_queue.get(), timeout=self.write_flush_interval
+                    )
+                except asyncio.TimeoutError:
+                    frame = ...
+                if frame is None:
+                    done = True
+                elif frame is not ...:
+                    pending_frames.append(frame)
+                if pending_frames and (
+                    done or frame is ... or len(pending_frames) >= self.write_batch_size
+                ):
+                    await self._save_frame_batch(
+                        pending_frames, video_id, mongodb_service
+                    )
+                    pending_frames = []
 
-        # Process any remaining frames in the pending batch
-        if mongodb_service and ai_service and pending_frames:
-            await self._process_and_save_frame_batch(
-                pending_frames, video_id, mongodb_service, ai_service
-            )
+        encoders = [asyncio.create_task(encode()) for _ in range(self.encode_workers)]
+        enrichers = [
+            asyncio.create_task(enrich())
+            for _ in range(self.ai_concurrency if with_ai else 0)
+        ]
+        writer = asyncio.create_task(write()) if with_ai else None
+        tasks = [*encoders, *enrichers] + ([writer] if writer else [])
 
+        try:
+            await decode()
+            # Shut the stages down in order, letting each drain its queue first
+            for _ in encoders:
+                await encode_queue.put(None)
+            await asyncio.gather(*encoders)
+            for _ in enrichers:
+                await ai_queue.put(None)
+            await asyncio.gather(*enrichers)
+            await asyncio.gather(*list(reuse_tasks))
+            if writer:
+                await write_queue.put(None)
+                await writer
+        finally:
+            for task in tasks + list(reuse_tasks):
+                if not task.done():
+                    task.cancel()
+
+        frames_data.sort(key=lambda frame: frame["frame_number"])
         return frames_data
 
-    async def _process_single_frame(self, frame, ai_service):
-        """Process a single frame to generate description and embedding"""
+    def _read_next_sampled_frame(
+        self,
+        cap: cv2.VideoCapture,
+        current_frame: int,
+        frame_interval_frames: int,
+        scene_state: Optional[Dict[str, Any]] = None,
+    ):
+        """Read the next sampled frame at or after current_frame.
+
+        Only sampled frames are converted to images. The frames in between are skipped with
+        a seek, which avoids decoding most of them, or with grab(), which still decodes them,
+        depending on the sampling mode. Returns the frame and its index, or None at the end
+        of the video.
+        """
+        if self.sampling_mode == "decode":
+            while True:
+                ret, frame = cap.read()
+                if not ret:
+                    return None
+                if current_frame % frame_interval_frames == 0:
+                    return frame, current_frame
+                current_frame += 1
+
+        step = (
+            scene_state["check_frames"]
+            if self.sampling_mode == "scene"
+            else frame_interval_frames
+        )
+        while True:
+            # Next frame index on the sampling grid
+            target = -(-current_frame // step) * step
+            frame = self._read_frame_at(cap, current_frame, target)
+            if frame is None:
+                return None
+            if self.sampling_mode != "scene" or self._is_scene_change(
+                frame, target, frame_interval_frames, scene_state
+            ):
+                return frame, target
+            current_frame = target + 1
+
+    def _read_frame_at(self, cap: cv2.VideoCapture, current_frame: int, target: int):
+        """Decode the frame at index target, given the capture is positioned at current_frame"""
+        if self.sampling_mode == "seek" and target - current_frame > self.seek_min_gap:
+            # Jumps to the nearest keyframe and decodes forward from there
+            cap.set(cv2.CAP_PROP_POS_FRAMES, target)
+        else:
+            # grab() decodes each frame but doesn't convert it to an image
+            for _ in range(target - current_frame):
+                if not cap.grab():
+                    return None
+        ret, frame = cap.read()
+        return frame if ret else None
+
+    def _is_scene_change(
+        self,
+        frame,
+        frame_index: int,
+        frame_interval_frames: int,
+        scene_state: Dict[str, Any],
+    ) -> bool:
+        """Whether a frame differs enough from the last sampled one to be kept.
+
+        Frames are compared by their hue/saturation histograms. A frame is always kept once
+        frame_interval_frames have passed since the last one, so static scenes are still
+        sampled at the regular interval.
+        """
+        small = cv2.resize(frame, (64, 36), interpolation=cv2.INTER_AREA)
+        hsv = cv2.cvtColor(small, cv2.COLOR_BGR2HSV)
+        histogram = cv2.calcHist([hsv], [0, 1], None, [16, 16], [0, 180, 0, 256])
+        cv2.normalize(histogram, histogram)
+
+        last_histogram = scene_state.get("histogram")
+        keep = (
+            last_histogram is None
+            or frame_index - scene_state["frame_index"] >= frame_interval_frames
+            or cv2.compareHist(last_histogram, histogram, cv2.HISTCMP_BHATTACHARYYA)
+            >= self.scene_threshold
+        )
+        if keep:
+            scene_state["histogram"] = histogram
+            scene_state["frame_index"] = frame_index
+        return keep
+
+    def _get_encode_pool(self) -> ProcessPoolExecutor:
+        """Process pool for JPEG and thumbnail encoding, created on first use"""
+        if self._encode_pool is None:
+            self._encode_pool = ProcessPoolExecutor(
+                max_workers=self.encode_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._encode_pool
+
+    async def _process_single_frame(self, frame, ai_service, image=None):
+        """Process a single frame to generate description and embedding.
+
+        image is the already decoded frame as a PIL Image; without it the frame is
+        embedded from its file.
+        """
         try:
             frame_path = frame["file_path"]
 
             # Generate description and embedding concurrently
-            description_task = ai_service.generate_frame_description(frame_path)
-            embedding_task = ai_service.get_voyage_embedding(frame_path)
+            description_task = timed_await(
+                INGEST_STAGE_SECONDS,
+                ai_service.generate_frame_description(frame_path),
+                stage="describe",
+            )
+            embedding_task = timed_await(
+                INGEST_STAGE_SECONDS,
+                ai_service.get_voyage_embedding(
+                    image if image is not None else frame_path
+                ),
+                stage="embed",
+            )
 
             # Wait for both to complete
             description, embedding = await asyncio.gather(
@@ -275,58 +647,53 @@ class VideoProcessor:
             # Return frame with fallback data
             return {
                 **frame,
-                "description": "Frame processing failed",
+                "description": FALLBACK_DESCRIPTION,
                 "embedding": [0.0] * 1024,  # Fallback embedding
             }
 
-    async def _process_and_save_frame_batch(
-        self, frames_batch, video_id, mongodb_service, ai_service
-    ):
-        """Process a batch of frames concurrently with AI descriptions and embeddings, then save to database"""
+    async def _save_frame_batch(self, frames_batch, video_id, mongodb_service):
+        """Save a batch of frames with AI descriptions and embeddings to the database"""
         try:
-            # Process all frames in the batch concurrently
-            frame_tasks = [
-                self._process_single_frame(frame, ai_service) for frame in frames_batch
-            ]
-
-            # Wait for all frames to be processed
-            batch_with_ai = await asyncio.gather(*frame_tasks)
-
-            # Insert batch to database
-            await mongodb_service.insert_frame_batch(video_id, batch_with_ai)
-
+            with timed(INGEST_STAGE_SECONDS, stage="insert"):
+                await mongodb_service.insert_frame_batch(video_id, frames_batch)
             logger.info(
-                f"Saved batch of {len(batch_with_ai)} frames for video {video_id}."
+                f"Saved batch of {len(frames_batch)} frames for video {video_id}."
             )
-
-            # Small delay between batches to respect rate limits
-            await asyncio.sleep(1.0)
-
         except Exception as e:
             logger.error(f"Failed to save frame batch: {e}")
             # Continue processing - some frames missing is better than crashing entire video
 
+    def shutdown(self):
+        """Stop the frame encoding worker processes"""
+        if self._encode_pool is not None:
+            self._encode_pool.shutdown(cancel_futures=True)
+            self._encode_pool = None
+
     async def cleanup_video_files(self, video_id: str):
         """Clean up video files and extracted frames"""
         try:
-            # Remove frames directory
-            video_frames_dir = self.frames_dir / video_id
-            if video_frames_dir.exists():
-                shutil.rmtree(video_frames_dir)
-                logger.info(f"Cleaned up frames for video {video_id}")
-
-            # Remove uploaded video file
-            for video_file in self.upload_dir.glob(f"{video_id}.*"):
-                video_file.unlink()
-                logger.info(f"Cleaned up video file: {video_file}")
-
-            # Remove frontend video file
-            for frontend_video_file in self.frontend_videos_dir.glob(f"{video_id}.*"):
-                frontend_video_file.unlink()
-                logger.info(f"Cleaned up frontend video file: {frontend_video_file}")
-
+            # Removing thousands of frame files blocks, so it runs in a worker thread
+            await asyncio.to_thread(self._remove_video_files, video_id)
         except Exception as e:
             logger.error(f"Failed to cleanup video files: {e}")
+            raise
+
+    def _remove_video_files(self, video_id: str):
+        # Remove frames directory
+        video_frames_dir = self.frames_dir / video_id
+        if video_frames_dir.exists():
+            shutil.rmtree(video_frames_dir)
+            logger.info(f"Cleaned up frames for video {video_id}")
+
+        # Remove uploaded video file
+        for video_file in self.upload_dir.glob(f"{video_id}.*"):
+            video_file.unlink()
+            logger.info(f"Cleaned up video file: {video_file}")
+
+        # Remove frontend video file
+        for frontend_video_file in self.frontend_videos_dir.glob(f"{video_id}.*"):
+            frontend_video_file.unlink()
+            logger.info(f"Cleaned up frontend video file: {frontend_video_file}")
 
 
 # Global instance
@@ -64,7 +64,8 @@ def setup_indexes():
                             "numDimensions": EMBEDDING_DIM_SIZE,
                             "similarity": "cosine",
                             "quantization": "scalar",
-                        }
+                        },
+                        {"type": "filter", "path": "video_id"},
                     ]
                 }
 
@@ -0,0 +1,357 @@
+import argparse
+import hashlib
+import json
+import logging
+import platform
+import random
+import resource
+import string
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from multiprocessing import get_context
+from typing import Dict, List, Optional
+
+import create_embeddings
+import numpy as np
+import pandas as pd
+import utils
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s: %(message)s")
+
+# Specifications for arguments to the script
+parser = argparse.ArgumentParser()
+parser.add_argument(
+    "--providers",
+    type=str,
+    default=",".join(create_embeddings.func_map),
+    help="Comma-separated providers to benchmark. OpenAI and Cohere are replaced by a local stub.",
+)
+parser.add_argument(
+    "--rows",
+    type=str,
+    default="1000,10000",
+    help="Comma-separated number of rows in each synthetic corpus.",
+)
+parser.add_argument(
+    "--text-lengths",
+    type=str,
+    default="64,512",
+    help="Comma-separated approximate number of characters per text.",
+)
+parser.add_argument(
+    "--concurrency",
+    type=int,
+    default=1,
+    help="Number of embedding batches to keep in flight at once.",
+)
+parser.add_argument(
+    "--stub-latency-ms",
+    type=float,
+    default=50.0,
+    help="Simulated round-trip latency of each request to the OpenAI/Cohere stub.",
+)
+parser.add_argument(
+    "--vector-format",
+    type=str,
+    default="array",
+    choices=utils.VECTOR_FORMATS,
+    help="Format to store embeddings in. One of array, float32, int8 or packed_bit.",
+)
+parser.add_argument(
+    "--uri",
+    type=str,
+    default=None,
+    help="Connection string of a local mongod to measure ingest time against. Ingestion is skipped if not set.",
+)
+parser.add_argument(
+    "--seed",
+    type=int,
+    default=42,
+    help="Seed for generating the synthetic corpora.",
+)
+parser.add_argument(
+    "--output",
+    type=str,
+    default="benchmark_report",
+    help="Path prefix of the JSON and Markdown reports.",
+)
+
+
+def generate_texts(rows: int, text_length: int, seed: int) -> List[str]:
+    """
+    Generate a deterministic synthetic corpus of texts made up of random words.
+
+    Args:
+        rows (int): Number of texts to generate
+        text_length (int): Approximate number of characters per text
+        seed (int): Random seed
+
+    Returns:
+        List[str]: Synthetic texts
+    """
+    rng = random.Random(seed)
+    vocabulary = [
+        "".join(rng.choices(string.ascii_lowercase, k=rng.randint(2, 10)))
+        for _ in range(5000)
+    ]
+    texts = []
+    for _ in range(rows):
+        # Vary text lengths by +/-50% so padding and sorting effects show up
+        target = max(1, int(text_length * rng.uniform(0.5, 1.5)))
+        words = []
+        length = 0
+        while length < target:
+            word = rng.choice(vocabulary)
+            words.append(word)
+            length += len(word) + 1
+        texts.append(" ".join(words))
+    return texts
+
+
+def get_stub_embeddings(provider: str, latency_ms: float):
+    """
+    Build a deterministic local stand-in for a proprietary embeddings API.
+
+    Args:
+        provider (str): Embeddings provider to imitate. One of `openai` or `cohere`
+        latency_ms (float): Simulated round-trip latency per request
+
+    Returns:
+        Callable: Embedding function with the same signature as the `func_map` functions
+    """
+    dimensions = utils.MODEL_INFO[provider][1]
+
+    def stub(client: None, model: None, docs: List[str]) -> List[List[float]]:
+        time.sleep(latency_ms / 1000)
+        embeddings = []
+        for doc in docs:
+            seed = int.from_bytes(
+                hashlib.sha256(doc.encode("utf-8")).digest()[:8], "big"
+            )
+            vector = np.random.default_rng(seed).standard_normal(dimensions)
+            embeddings.append((vector / np.linalg.norm(vector)).tolist())
+        return embeddings
+
+    return stub
+
+
+def timed(emb_fn, latencies: List[float]):
+    """
+    Wrap an embedding function to record the latency of each batch.
+
+    Args:
+        emb_fn (Callable): Embedding function from `func_map`
+        latencies (List[float]): List to append batch latencies in seconds to
+
+    Returns:
+        Callable: Wrapped embedding function
+    """
+    lock = threading.Lock()
+
+    def wrapper(*fn_args, **fn_kwargs):
+        start = time.perf_counter()
+        try:
+            return emb_fn(*fn_args, **fn_kwargs)
+        finally:
+            with lock:
+                latencies.append(time.perf_counter() - start)
+
+    return wrapper
+
+
+def peak_rss_mb() -> float:
+    """
+    Get the peak resident set size of the current process.
+
+    Returns:
+        float: Peak RSS in megabytes
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and in kilobytes on Linux
+    if sys.platform == "darwin":
+        return peak / (1024 * 1024)
+    return peak / 1024
+
+
+def run_case(config: Dict) -> Dict:
+    """
+    Embed (and optionally ingest) one synthetic corpus with one provider.
+
+    Runs in a fresh worker process so that peak RSS is measured per case.
+
+    Args:
+        config (Dict): Provider, corpus size and settings for the case
+
+    Returns:
+        Dict: Measurements for the case
+    """
+    provider = config["provider"]
+    cli_args = [
+        "--path",
+        "synthetic.csv",
+        "--type",
+        provider,
+        "--field",
+        "text",
+        "--uri",
+        config["uri"] or "",
+        "--db",
+        "embeddings_benchmark",
+        "--coll",
+        f"{provider}_{config['rows']}_{config['text_length']}",
+        "--vector-format",
+        config["vector_format"],
+    ]
+    create_embeddings.args = create_embeddings.parser.parse_args(cli_args)
+
+    latencies = []
+    if provider == "huggingface":
+        emb_fn = create_embeddings.func_map[provider]
+    else:
+        emb_fn = get_stub_embeddings(provider, config["stub_latency_ms"])
+    create_embeddings.func_map[provider] = timed(emb_fn, latencies)
+    if provider == "huggingface":
+        # Load the model up front so that loading time isn't counted as throughput
+        utils.get_hf_model(create_embeddings.args.hf_device)
+
+    texts = generate_texts(config["rows"], config["text_length"], config["seed"])
+    data = pd.DataFrame({"text": texts})
+
+    start = time.perf_counter()
+    data["embeddings"] = create_embeddings.get_embeddings(
+        provider, None, texts, config["concurrency"]
+    )
+    embed_seconds = time.perf_counter() - start
+
+    ingest_seconds = None
+    if config["uri"]:
+        mongo_client = utils.get_mongo_client(config["uri"])
+        start = time.perf_counter()
+        create_embeddings.ingest(mongo_client, data, None)
+        ingest_seconds = time.perf_counter() - start
+        mongo_client[create_embeddings.args.db].drop_collection(
+            create_embeddings.args.coll
+        )
+        mongo_client.close()
+
+    return {
+        "provider": provider,
+        "stubbed": provider != "huggingface",
+        "rows": config["rows"],
+        "text_length": config["text_length"],
+        "concurrency": config["concurrency"],
+        "vector_format": config["vector_format"],
+        "embed_seconds": embed_seconds,
+        "rows_per_second": config["rows"] / embed_seconds,
+        "batches": len(latencies),
+        "batch_latency_p50_ms": batch_percentile_ms(latencies, 50),
+        "batch_latency_p99_ms": batch_percentile_ms(latencies, 99),
+        "peak_rss_mb": peak_rss_mb(),
+        "ingest_seconds": ingest_seconds,
+    }
+
+
+def batch_percentile_ms(latencies: List[float], percentile: float) -> Optional[float]:
+    """
+    Percentile of the batch latencies in milliseconds.
+
+    Hugging Face models encode the whole corpus in one call, and a single sample says
+    nothing about the distribution.
+
+    Args:
+        latencies (List[float]): Latency of each batch in seconds
+        percentile (float): Percentile to compute
+
+    Returns:
+        Optional[float]: The percentile, or None if fewer than two batches were run
+    """
+    if len(latencies) < 2:
+        return None
+    return float(np.percentile(latencies, percentile)) * 1000
+
+
+def to_markdown(report: Dict) -> str:
+    """
+    Render a benchmark report as a Markdown table.
+
+    Args:
+        report (Dict): Benchmark report
+
+    Returns:
+        str: Markdown report
+    """
+    lines = [
+        "# Embeddings generator benchmark",
+        "",
+        f"Run at {report['timestamp']} on Python {report['python']} ({report['platform']}).",
+        "",
+        "| Provider | Rows | Text length | Concurrency | Rows/sec | p50 batch (ms) | p99 batch (ms) | Peak RSS (MB) | Ingest (s) |",
+        "|---|---|---|---|---|---|---|---|---|",
+    ]
+    for r in report["results"]:
+        provider = f"{r['provider']} (stub)" if r["stubbed"] else r["provider"]
+        ingest = "-" if r["ingest_seconds"] is None else f"{r['ingest_seconds']:.2f}"
+        p50, p99 = (
+            "-" if r[key] is None else f"{r[key]:.1f}"
+            for key in ("batch_latency_p50_ms", "batch_latency_p99_ms")
+        )
+        lines.append(
+            f"| {provider} | {r['rows']} | {r['text_length']} | {r['concurrency']} "
+            f"| {r['rows_per_second']:.1f} | {p50} | {p99} "
+            f"| {r['peak_rss_mb']:.1f} | {ingest} |"
+        )
+    return "\n".join(lines) + "\n"
+
+
+def main():
+    """Main function"""
+    args = parser.parse_args()
+    providers = [p.strip() for p in args.providers.split(",") if p.strip()]
+    for provider in providers:
+        if provider not in create_embeddings.func_map:
+            raise utils.ClientError(f"Provider {provider} is not supported.")
+
+    results = []
+    for provider in providers:
+        for rows in [int(r) for r in args.rows.split(",")]:
+            for text_length in [int(t) for t in args.text_lengths.split(",")]:
+                config = {
+                    "provider": provider,
+                    "rows": rows,
+                    "text_length": text_length,
+                    "concurrency": args.concurrency,
+                    "stub_latency_ms": args.stub_latency_ms,
+                    "vector_format": args.vector_format,
+                    "uri": args.uri,
+                    "seed": args.seed,
+                }
+                logging.info(
+                    f"Benchmarking {provider} with {rows} rows of ~{text_length} characters..."
+                )
+                with ProcessPoolExecutor(
+                    max_workers=1, mp_context=get_context("spawn")
+                ) as executor:
+                    result = executor.submit(run_case, config).result()
+                logging.info(
+                    f"{result['rows_per_second']:.1f} rows/sec, peak RSS {result['peak_rss_mb']:.1f} MB"
+                )
+                results.append(result)
+
+    report = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+    with open(f"{args.output}.json", "w") as f:
+        json.dump(report, f, indent=2)
+    with open(f"{args.output}.md", "w") as f:
+        f.write(to_markdown(report))
+    logging.info(f"Wrote {args.output}.json and {args.output}.md")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,20 @@
 import argparse
+import json
 import logging
+import random
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import List, Union
+from functools import partial
+from typing import Dict, Iterator, List, Optional, Union
 
 import cohere
 import openai
 import pandas as pd
+import pymongo
 import utils
+from embedding_cache import EmbeddingCache
 from tqdm import tqdm
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s: %(message)s")
@@ -46,41 +54,237 @@ parser.add_argument(
     default="embeddings",
     help="Field in the csv to generate embeddings for.",
 )
-args = parser.parse_args()
+parser.add_argument(
+    "--stream",
+    action="store_true",
+    help="Read, embed and ingest the csv in chunks instead of loading it all into memory.",
+)
+parser.add_argument(
+    "--chunk-rows",
+    type=int,
+    default=10000,
+    help="Number of csv rows per chunk when --stream is set.",
+)
+parser.add_argument(
+    "--concurrency",
+    type=int,
+    default=1,
+    help="Number of embedding batches to keep in flight at once.",
+)
+parser.add_argument(
+    "--cache",
+    type=str,
+    default=None,
+    help="Path to a local SQLite file used to cache embeddings across runs.",
+)
+parser.add_argument(
+    "--cache-size-mb",
+    type=int,
+    default=1024,
+    help="Maximum size of the embeddings cache in megabytes.",
+)
+parser.add_argument(
+    "--checkpoint",
+    type=str,
+    default=None,
+    help="Path to a progress file. Enables idempotent, resumable upsert-based ingestion.",
+)
+parser.add_argument(
+    "--resume",
+    action="store_true",
+    help="Resume ingestion from the last batch committed in the --checkpoint file.",
+)
+parser.add_argument(
+    "--id-field",
+    type=str,
+    default=None,
+    help="Field in the csv that uniquely identifies a row. Defaults to the row number.",
+)
+parser.add_argument(
+    "--ingest-batch-size",
+    type=int,
+    default=1000,
+    help="Number of documents per bulk upsert when --checkpoint is set.",
+)
+parser.add_argument(
+    "--vector-format",
+    type=str,
+    default="array",
+    choices=utils.VECTOR_FORMATS,
+    help="Format to store embeddings in. One of array, float32, int8 or packed_bit.",
+)
+parser.add_argument(
+    "--index-definition",
+    type=str,
+    default=None,
+    help="Path to write the matching Atlas Vector Search index definition to.",
+)
+parser.add_argument(
+    "--hf-device",
+    type=str,
+    default=None,
+    help="Device to run the Hugging Face model on, eg. cpu or cuda. Picks a GPU if available by default.",
+)
+parser.add_argument(
+    "--hf-batch-size",
+    type=int,
+    default=32,
+    help="Number of texts the Hugging Face model encodes at once.",
+)
+parser.add_argument(
+    "--hf-workers",
+    type=int,
+    default=1,
+    help="Number of worker processes to encode with the Hugging Face model.",
+)
+# Parsed command line arguments. Set when run as a script, or by callers importing this module.
+args = None
+
+# Number of texts sent to the embedding provider per request
+BATCH_SIZE = 128
+# Number of times a rate-limited batch is retried before giving up
+MAX_RETRIES = 6
+
+
+def embed_batch(emb_fn, client, model, batch: List[str]) -> List[List[float]]:
+    """
+    Embed a single batch, backing off exponentially if the provider rate-limits the request.
+
+    Args:
+        emb_fn (Callable): Embedding function from `func_map`
+        client (Union[openai.OpenAI, cohere.client.Client, None]): Client to interface with proprietary embeddings APIs. Only required for OpenAI, Cohere.
+        model (Union[SentenceTransformer, None]): Embedding model. Only required for Hugging Face models.
+        batch (List[str]): List of texts to embed
+
+    Returns:
+        List[List[float]]: Array of embeddings, or None if the batch failed
+    """
+    for attempt in range(MAX_RETRIES + 1):
+        try:
+            return emb_fn(client, model, batch)
+        except utils.RateLimitError as e:
+            if attempt == MAX_RETRIES:
+                logging.error(f"Batch still rate-limited after {MAX_RETRIES} retries.")
+                return None
+            delay = min(2**attempt, 60) + random.uniform(0, 1)
+            logging.warning(f"Rate limited ({e}), retrying batch in {delay:.1f}s...")
+            time.sleep(delay)
 
 
 def get_embeddings(
     provider: str,
     client: Union[openai.OpenAI, cohere.client.Client, None],
     texts: List[str],
+    concurrency: int = 1,
+    cache: Optional[EmbeddingCache] = None,
+    hf_pool: Optional[Dict] = None,
 ) -> List[List[float]]:
     """
     Choose the embedding function based on the provider, and generate embeddings in batches.
 
+    Up to `concurrency` batches are in flight at once. Results are collected in submission
+    order, so the returned embeddings always line up with `texts`. If a cache is provided,
+    only texts that are not already in it are sent to the provider.
+
     Args:
         provider (str): Embeddings provider. One of `openai`, `cohere`, `huggingface`
         client (Union[openai.OpenAI, cohere.client.Client, None]): Client to interface with proprietary embeddings APIs. Only required fpr OpenAI, Cohere.
         texts (List[str]): List of texts to embed
+        concurrency (int): Number of batches to keep in flight
+        cache (Optional[EmbeddingCache]): Cache of previously generated embeddings
+        hf_pool (Optional[Dict]): Multi-process pool to encode with. Only used for Hugging Face models.
 
     Returns:
         List[List[float]]: Array of embeddings
     """
+    if concurrency < 1:
+        raise utils.ClientError("--concurrency must be a positive integer.")
+
     model = None
+    batch_size = BATCH_SIZE
     if provider == "openai":
         emb_fn = func_map.get("openai")
     elif provider == "cohere":
         emb_fn = func_map.get("cohere")
     else:
-        emb_fn = func_map.get("huggingface")
-        model = utils.SentenceTransformer("thenlper/gte-small")
+        emb_fn = partial(
+            func_map.get("huggingface"), batch_size=args.hf_batch_size, pool=hf_pool
+        )
+        model = utils.get_hf_model(args.hf_device)
+        # The model batches internally and sorts texts by length across the whole call,
+        # so hand it all the texts at once and parallelize with worker processes instead of threads
+        batch_size = max(len(texts), 1)
+        concurrency = 1
+
+    def embed(texts: List[str]) -> List[List[float]]:
+        return embed_texts(emb_fn, client, model, texts, concurrency, batch_size)
+
+    if cache is None:
+        return embed(texts)
+
+    model_name, dimensions = utils.MODEL_INFO[provider]
+    keys = [cache.key(provider, model_name, dimensions, text) for text in texts]
+    embeddings = cache.get_many(keys)
+    missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+    if missing:
+        new_embeddings = embed([texts[i] for i in missing])
+        cache.put_many([keys[i] for i in missing], new_embeddings)
+        for i, embedding in zip(missing, new_embeddings):
+            embeddings[i] = embedding
+
+    return embeddings
 
+
+def embed_texts(
+    emb_fn,
+    client,
+    model,
+    texts: List[str],
+    concurrency: int,
+    batch_size: int = BATCH_SIZE,
+) -> List[List[float]]:
+    """
+    Embed texts in batches of `batch_size`, keeping up to `concurrency` batches in flight.
+
+    Args:
+        emb_fn (Callable): Embedding function from `func_map`
+        client (Union[openai.OpenAI, cohere.client.Client, None]): Client to interface with proprietary embeddings APIs. Only required for OpenAI, Cohere.
+        model (Union[SentenceTransformer, None]): Embedding model. Only required for Hugging Face models.
+        texts (List[str]): List of texts to embed
+        concurrency (int): Number of batches to keep in flight
+        batch_size (int): Number of texts per batch
+
+    Returns:
+        List[List[float]]: Array of embeddings, in the same order as `texts`
+    """
     embeddings = []
-    for i in tqdm(range(0, len(texts), 128)):
-        end = min(len(texts), i + 128)
-        batch = texts[i:end]
-        batch_embeddings = emb_fn(client, model, batch)
-        if batch_embeddings is not None:
-            embeddings.extend(batch_embeddings)
+    starts = range(0, len(texts), batch_size)
+    # Bound the number of pending futures so finished results don't pile up behind a slow batch
+    in_flight = deque()
+    executor = ThreadPoolExecutor(max_workers=concurrency)
+
+    def collect() -> None:
+        start, future = in_flight.popleft()
+        batch_embeddings = future.result()
+        if batch_embeddings is None:
+            raise utils.EmbeddingError(
+                f"Failed to generate embeddings for rows {start} to {min(len(texts), start + batch_size) - 1}."
+            )
+        embeddings.extend(batch_embeddings)
+        pbar.update(1)
+
+    with tqdm(total=len(starts)) as pbar:
+        try:
+            for start in starts:
+                batch = texts[start : start + batch_size]
+                future = executor.submit(embed_batch, emb_fn, client, model, batch)
+                in_flight.append((start, future))
+                if len(in_flight) >= 2 * concurrency:
+                    collect()
+            while in_flight:
+                collect()
+        finally:
+            executor.shutdown(cancel_futures=True)
 
     return embeddings
 
@@ -105,6 +309,31 @@ def get_data(path: str, field: str) -> pd.DataFrame:
         raise utils.DataError(e)
 
 
+def get_data_chunks(path: str, field: str, chunk_rows: int) -> Iterator[pd.DataFrame]:
+    """
+    Lazily load the dataset as Pandas dataframes of at most `chunk_rows` rows.
+
+    Args:
+        path (str): Absolute path to the CSV file
+        field (str): Field to generate embeddings for
+        chunk_rows (int): Maximum number of rows per chunk
+
+    Yields:
+        pd.DataFrame: Next chunk of the dataset
+    """
+    if chunk_rows < 1:
+        raise utils.DataError("--chunk-rows must be a positive integer.")
+    try:
+        reader = pd.read_csv(path, chunksize=chunk_rows)
+        for chunk in reader:
+            chunk = chunk.dropna(subset=[field])
+            if not chunk.empty:
+                yield chunk
+    except Exception as e:
+        logging.error("Error reading the CSV file.")
+        raise utils.DataError(e)
+
+
 # Mapping provider names to their respective embedding functions
 func_map = {
     "openai": utils.get_openai_embeddings,
@@ -113,6 +342,81 @@ func_map = {
 }
 
 
+def ingest(
+    mongo_client: pymongo.MongoClient,
+    data: pd.DataFrame,
+    checkpoint: Optional[utils.Checkpoint],
+    drop: bool = True,
+) -> None:
+    """
+    Ingest data into the target collection, upserting in checkpointed batches if a checkpoint is provided.
+
+    Args:
+        mongo_client (pymongo.MongoClient): MongoDB client
+        data (pd.DataFrame): Data to ingest
+        checkpoint (Optional[utils.Checkpoint]): Checkpoint tracking ingestion progress
+        drop (bool): Whether to drop existing data before inserting. Ignored when checkpointing.
+    """
+    data["embeddings"] = [
+        utils.to_bson_vector(embedding, args.vector_format)
+        for embedding in data["embeddings"]
+    ]
+    if checkpoint is None:
+        utils.ingest_data(mongo_client, data, args.db, args.coll, drop=drop)
+    else:
+        utils.upsert_data(
+            mongo_client,
+            data,
+            args.db,
+            args.coll,
+            id_field=args.id_field,
+            batch_size=args.ingest_batch_size,
+            checkpoint=checkpoint,
+        )
+
+
+def stream_data(
+    provider: str,
+    client: Union[openai.OpenAI, cohere.client.Client, None],
+    path: str,
+    field: str,
+    chunk_rows: int,
+    cache: Optional[EmbeddingCache] = None,
+    checkpoint: Optional[utils.Checkpoint] = None,
+    hf_pool: Optional[Dict] = None,
+) -> None:
+    """
+    Embed and ingest the dataset one chunk at a time, so memory usage is bounded by the chunk size.
+
+    Args:
+        provider (str): Embeddings provider. One of `openai`, `cohere`, `huggingface`
+        client (Union[openai.OpenAI, cohere.client.Client, None]): Client to interface with proprietary embeddings APIs. Only required for OpenAI, Cohere.
+        path (str): Absolute path to the CSV file
+        field (str): Field to generate embeddings for
+        chunk_rows (int): Maximum number of rows per chunk
+        cache (Optional[EmbeddingCache]): Cache of previously generated embeddings
+        checkpoint (Optional[utils.Checkpoint]): Checkpoint tracking ingestion progress
+        hf_pool (Optional[Dict]): Multi-process pool to encode with. Only used for Hugging Face models.
+    """
+    mongo_client = utils.get_mongo_client(args.uri)
+    total = 0
+    for i, chunk in enumerate(get_data_chunks(path, field, chunk_rows)):
+        if checkpoint is not None:
+            # Skip rows committed by a previous run before paying for their embeddings
+            chunk = chunk[chunk.index > checkpoint.last_row].copy()
+            if chunk.empty:
+                continue
+        logging.info(f"Generating embeddings for chunk {i + 1}...")
+        chunk["embeddings"] = get_embeddings(
+            provider, client, chunk[field].tolist(), args.concurrency, cache, hf_pool
+        )
+        # Only reset the target collection before the first chunk
+        ingest(mongo_client, chunk, checkpoint, drop=i == 0)
+        total += len(chunk)
+        logging.info(f"Inserted {total} documents into MongoDB so far.")
+    logging.info(f"Inserted {total} documents into MongoDB.")
+
+
 def main():
     """Main function"""
     provider = args.type
@@ -121,18 +425,72 @@ def main():
     path = args.path
     field = args.field
 
-    logging.info("Loading the dataset...")
-    data = get_data(path, field)
-    texts = data[args.field].tolist()
+    checkpoint = None
+    if args.checkpoint:
+        run = {"path": path, "field": field, "db": args.db, "coll": args.coll}
+        checkpoint = utils.Checkpoint(args.checkpoint, run, resume=args.resume)
+        if args.resume:
+            logging.info(f"Resuming after row {checkpoint.last_row}...")
+    elif args.resume:
+        raise utils.DataError("--resume requires --checkpoint.")
 
-    logging.info("Generating embeddings...")
-    data["embeddings"] = get_embeddings(provider, client, texts)
+    cache = None
+    if args.cache:
+        cache = EmbeddingCache(args.cache, args.cache_size_mb)
 
-    logging.info("Ingesting data into MongoDB...")
-    mongo_client = utils.get_mongo_client(args.uri)
-    utils.ingest_data(mongo_client, data, args.db, args.coll)
-    logging.info(f"Inserted {len(data)} documents into MongoDB.")
+    hf_pool = None
+    if provider == "huggingface" and args.hf_workers > 1:
+        model = utils.get_hf_model(args.hf_device)
+        hf_pool = model.start_multi_process_pool(
+            target_devices=[args.hf_device or "cpu"] * args.hf_workers
+        )
+
+    try:
+        if args.stream:
+            stream_data(
+                provider,
+                client,
+                path,
+                field,
+                args.chunk_rows,
+                cache,
+                checkpoint,
+                hf_pool,
+            )
+        else:
+            logging.info("Loading the dataset...")
+            data = get_data(path, field)
+            if checkpoint is not None:
+                data = data[data.index > checkpoint.last_row].copy()
+            texts = data[args.field].tolist()
+
+            logging.info("Generating embeddings...")
+            data["embeddings"] = get_embeddings(
+                provider, client, texts, args.concurrency, cache, hf_pool
+            )
+
+            logging.info("Ingesting data into MongoDB...")
+            mongo_client = utils.get_mongo_client(args.uri)
+            ingest(mongo_client, data, checkpoint)
+            logging.info(f"Inserted {len(data)} documents into MongoDB.")
+
+        index_definition = utils.get_vector_index_definition(
+            provider, args.vector_format
+        )
+        logging.info(
+            f"Vector Search index definition for the ingested embeddings:\n{json.dumps(index_definition, indent=2)}"
+        )
+        if args.index_definition:
+            with open(args.index_definition, "w") as f:
+                json.dump(index_definition, f, indent=2)
+    finally:
+        if hf_pool is not None:
+            utils.SentenceTransformer.stop_multi_process_pool(hf_pool)
+        if cache is not None:
+            logging.info(f"Embedding cache: {cache.hits} hits, {cache.misses} misses.")
+            cache.close()
 
 
 if __name__ == "__main__":
+    args = parser.parse_args()
     main()
@@ -0,0 +1,157 @@
+import hashlib
+import logging
+import sqlite3
+import time
+from typing import List, Optional
+
+import numpy as np
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s: %(message)s")
+
+# SQLite limits the number of host parameters per statement
+MAX_SQL_PARAMS = 900
+
+
+class EmbeddingCache:
+    """
+    Persistent SQLite cache of embeddings keyed by provider, model, dimensions and the SHA-256 of the text.
+
+    Vectors are stored as float32 blobs. When the cache grows past `max_size_mb`, the least recently
+    used entries are evicted.
+    """
+
+    def __init__(self, path: str, max_size_mb: int = 1024):
+        """
+        Open (or create) the cache database.
+
+        Args:
+            path (str): Path to the SQLite database file
+            max_size_mb (int): Maximum total size of the cached vectors in megabytes
+        """
+        self.conn = sqlite3.connect(path)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings "
+            "(key TEXT PRIMARY KEY, vector BLOB NOT NULL, last_used REAL NOT NULL)"
+        )
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)"
+        )
+        self.conn.commit()
+        self.max_bytes = max_size_mb * 1024 * 1024
+        self.size_bytes = self.conn.execute(
+            "SELECT COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings"
+        ).fetchone()[0]
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(provider: str, model: str, dimensions: int, text: str) -> str:
+        """
+        Build the cache key for a text.
+
+        Args:
+            provider (str): Embeddings provider
+            model (str): Embedding model name
+            dimensions (int): Number of embedding dimensions
+            text (str): Text to embed
+
+        Returns:
+            str: Cache key
+        """
+        digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        return f"{provider}:{model}:{dimensions}:{digest}"
+
+    def get_many(self, keys: List[str]) -> List[Optional[List[float]]]:
+        """
+        Look up embeddings for a list of keys.
+
+        Args:
+            keys (List[str]): Cache keys
+
+        Returns:
+            List[Optional[List[float]]]: Embeddings in the same order as `keys`, None for cache misses
+        """
+        found = {}
+        for i in range(0, len(keys), MAX_SQL_PARAMS):
+            batch = keys[i : i + MAX_SQL_PARAMS]
+            placeholders = ",".join("?" * len(batch))
+            rows = self.conn.execute(
+                f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})",
+                batch,
+            )
+            found.update(rows)
+
+        if found:
+            now = time.time()
+            self.conn.executemany(
+                "UPDATE embeddings SET last_used = ? WHERE key = ?",
+                [(now, key) for key in found],
+            )
+            self.conn.commit()
+
+        embeddings = []
+        for key in keys:
+            vector = found.get(key)
+            if vector is None:
+                self.misses += 1
+                embeddings.append(None)
+            else:
+                self.hits += 1
+                embeddings.append(np.frombuffer(vector, dtype=np.float32).tolist())
+        return embeddings
+
+    def put_many(self, keys: List[str], embeddings: List[List[float]]) -> None:
+        """
+        Store embeddings in the cache, evicting old entries if it grows too large.
+
+        Args:
+            keys (List[str]): Cache keys
+            embeddings (List[List[float]]): Embeddings in the same order as `keys`
+        """
+        now = time.time()
+        rows = {}
+        for key, embedding in zip(keys, embeddings):
+            rows[key] = np.asarray(embedding, dtype=np.float32).tobytes()
+        # Account for entries that are being overwritten before replacing them
+        unique_keys = list(rows)
+        for i in range(0, len(unique_keys), MAX_SQL_PARAMS):
+            batch = unique_keys[i : i + MAX_SQL_PARAMS]
+            placeholders = ",".join("?" * len(batch))
+            self.size_bytes -= self.conn.execute(
+                f"SELECT COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings WHERE key IN ({placeholders})",
+                batch,
+            ).fetchone()[0]
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)",
+            [(key, vector, now) for key, vector in rows.items()],
+        )
+        self.size_bytes += sum(len(vector) for vector in rows.values())
+        self.conn.commit()
+        self.evict()
+
+    def evict(self) -> None:
+        """Delete least recently used entries until the cache is within its size limit."""
+        evicted = 0
+        while self.size_bytes > self.max_bytes:
+            rows = self.conn.execute(
+                "SELECT key, LENGTH(vector) FROM embeddings ORDER BY last_used LIMIT 1000"
+            ).fetchall()
+            if not rows:
+                break
+            excess = self.size_bytes - self.max_bytes
+            stale = []
+            for key, size in rows:
+                stale.append((key,))
+                excess -= size
+                self.size_bytes -= size
+                if excess <= 0:
+                    break
+            self.conn.executemany("DELETE FROM embeddings WHERE key = ?", stale)
+            evicted += len(stale)
+        if evicted:
+            self.conn.commit()
+            logging.info(f"Evicted {evicted} embeddings from the cache.")
+
+    def close(self) -> None:
+        """Close the cache database."""
+        self.conn.close()
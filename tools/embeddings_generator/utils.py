@@ -1,15 +1,30 @@
 import getpass
+import json
 import logging
-from typing import List, Union
+import os
+from functools import cache
+from typing import Dict, List, Optional, Union
 
 import cohere
+import numpy as np
 import openai
 import pandas as pd
 import pymongo
+from bson.binary import Binary, BinaryVectorDtype
 from sentence_transformers import SentenceTransformer
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s: %(message)s")
 
+# Embedding model and number of dimensions used for each provider
+MODEL_INFO = {
+    "openai": ("text-embedding-3-small", 512),
+    "cohere": ("embed-english-v3.0", 1024),
+    "huggingface": ("thenlper/gte-small", 384),
+}
+
+# Formats in which embeddings can be stored in MongoDB
+VECTOR_FORMATS = ["array", "float32", "int8", "packed_bit"]
+
 
 # Class to handle client errors
 class ClientError(Exception):
@@ -21,6 +36,16 @@ class DataError(Exception):
     pass
 
 
+# Class to signal that the embeddings provider rate-limited a request
+class RateLimitError(Exception):
+    pass
+
+
+# Class to handle batches that could not be embedded
+class EmbeddingError(Exception):
+    pass
+
+
 def get_openai_client() -> openai.OpenAI:
     """
     Intiialize and vvalidate OpenAI client.
@@ -95,10 +120,14 @@ def get_openai_embeddings(
     try:
         docs = [doc.replace("\n", " ") for doc in docs]
         response = client.embeddings.create(
-            input=docs, model="text-embedding-3-small", dimensions=512
+            input=docs,
+            model=MODEL_INFO["openai"][0],
+            dimensions=MODEL_INFO["openai"][1],
         )
         response = [r.embedding for r in response.data]
         return response
+    except openai.RateLimitError as e:
+        raise RateLimitError(e)
     except Exception as e:
         logging.error(f"Error generating embeddings for batch: {e}")
         return None
@@ -120,31 +149,69 @@ def get_cohere_embeddings(
     """
     try:
         response = client.embed(
-            docs, input_type="search_document", model="embed-english-v3.0"
+            docs, input_type="search_document", model=MODEL_INFO["cohere"][0]
         )
         return response.embeddings
+    except cohere.error.CohereAPIError as e:
+        if e.http_status == 429:
+            raise RateLimitError(e)
+        logging.error(f"Error generating embeddings for batch: {e}")
+        return None
     except Exception as e:
         logging.error(f"Error generating embeddings for batch: {e}")
         return None
 
 
+@cache
+def get_hf_model(device: Optional[str] = None) -> SentenceTransformer:
+    """
+    Load the gte-small model from Hugging Face. The model is only loaded once per device.
+
+    Args:
+        device (Optional[str]): Device to run the model on, eg. `cpu` or `cuda`. Picks a GPU if available by default.
+
+    Returns:
+        SentenceTransformer: gte-small model from Hugging Face
+    """
+    return SentenceTransformer(MODEL_INFO["huggingface"][0], device=device)
+
+
 def get_hf_embeddings(
-    client: None, model: SentenceTransformer, docs: List[str]
-) -> List[List[float]]:
+    client: None,
+    model: SentenceTransformer,
+    docs: List[str],
+    batch_size: int = 32,
+    pool: Optional[Dict] = None,
+) -> np.ndarray:
     """
-    Get embeddings using the gte-small model from Hugging Face/
+    Get embeddings using the gte-small model from Hugging Face.
+
+    Texts are sorted by length before encoding so that each internal batch needs as little padding as possible.
 
     Args:
         client (None): Client. Only required for OpenAI and Cohere
         model (SentenceTransformer.SentenceTransformer): gte-small model from Hugging Face
         docs (List[str]): List of texts to embed
+        batch_size (int): Number of texts the model encodes at once
+        pool (Optional[Dict]): Multi-process pool from `model.start_multi_process_pool()` to spread encoding across workers
 
     Returns:
-        List[List[float]]: Array of embeddings
+        np.ndarray: float32 array of embeddings, one row per text
     """
     try:
-        response = model.encode(docs).tolist()
-        return response
+        order = np.argsort([-len(doc) for doc in docs], kind="stable")
+        sorted_docs = [docs[i] for i in order]
+        if pool is not None:
+            sorted_embeddings = model.encode_multi_process(
+                sorted_docs, pool, batch_size=batch_size
+            )
+        else:
+            sorted_embeddings = model.encode(
+                sorted_docs, batch_size=batch_size, convert_to_numpy=True
+            )
+        embeddings = np.empty(sorted_embeddings.shape, dtype=np.float32)
+        embeddings[order] = sorted_embeddings
+        return embeddings
     except Exception as e:
         logging.error(f"Error generating embeddings for batch: {e}")
         return None
@@ -171,7 +238,11 @@ def get_mongo_client(mongo_uri: str) -> pymongo.MongoClient:
 
 
 def ingest_data(
-    client: pymongo.MongoClient, data: pd.DataFrame, db: str, coll: str
+    client: pymongo.MongoClient,
+    data: pd.DataFrame,
+    db: str,
+    coll: str,
+    drop: bool = True,
 ) -> None:
     """
     Ingest data with embeddings into MongoDB
@@ -181,9 +252,161 @@ def ingest_data(
         data (pd.DataFrame): Data to ingest
         db (str): Database to ingest data into
         coll (str): Collection to ingest data into
+        drop (bool): Whether to drop existing data before inserting. Set to False when ingesting in chunks.
     """
-    db = client[db]
-    collection = db[coll]
-    db.collection.drop()
+    collection = client[db][coll]
+    if drop:
+        collection.drop()
     docs = data.to_dict("records")
     collection.insert_many(docs)
+
+
+class Checkpoint:
+    """
+    Progress file recording the last CSV row that was committed to MongoDB.
+    """
+
+    def __init__(self, path: str, run: Dict[str, str], resume: bool = False):
+        """
+        Load or initialize a checkpoint.
+
+        Args:
+            path (str): Path to the checkpoint file
+            run (Dict[str, str]): Parameters identifying the run, eg. the CSV path and target collection
+            resume (bool): Whether to resume from an existing checkpoint file
+        """
+        self.path = path
+        self.run = run
+        self.last_row = -1
+        if resume:
+            try:
+                with open(path) as f:
+                    state = json.load(f)
+            except (OSError, ValueError) as e:
+                logging.error("Error reading the checkpoint file.")
+                raise DataError(e)
+            if state["run"] != run:
+                raise DataError(
+                    f"Checkpoint {path} was created for a different run: {state['run']}"
+                )
+            self.last_row = state["last_row"]
+        else:
+            self.commit(self.last_row)
+
+    def commit(self, last_row: int) -> None:
+        """
+        Atomically record that all rows up to and including `last_row` have been ingested.
+
+        Args:
+            last_row (int): Index of the last ingested CSV row
+        """
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"run": self.run, "last_row": last_row}, f)
+        os.replace(tmp_path, self.path)
+        self.last_row = last_row
+
+
+def upsert_data(
+    client: pymongo.MongoClient,
+    data: pd.DataFrame,
+    db: str,
+    coll: str,
+    id_field: Optional[str] = None,
+    batch_size: int = 1000,
+    checkpoint: Optional[Checkpoint] = None,
+) -> None:
+    """
+    Idempotently ingest data with embeddings into MongoDB using batches of unordered upserts.
+
+    Args:
+        client (pymongo.MongoClient): MongoDB client
+        data (pd.DataFrame): Data to ingest
+        db (str): Database to ingest data into
+        coll (str): Collection to ingest data into
+        id_field (Optional[str]): Field in the csv to use as the document `_id`. Defaults to the row number in the csv.
+        batch_size (int): Number of documents per bulk write
+        checkpoint (Optional[Checkpoint]): Checkpoint to update after each committed batch
+    """
+    collection = client[db][coll]
+    for i in range(0, len(data), batch_size):
+        batch = data.iloc[i : i + batch_size]
+        docs = batch.to_dict("records")
+        row_ids = [int(row_id) for row_id in batch.index]
+        ops = []
+        for row_id, doc in zip(row_ids, docs):
+            doc_id = doc[id_field] if id_field else row_id
+            ops.append(pymongo.UpdateOne({"_id": doc_id}, {"$set": doc}, upsert=True))
+        collection.bulk_write(ops, ordered=False)
+        if checkpoint is not None:
+            checkpoint.commit(row_ids[-1])
+
+
+def to_bson_vector(
+    embedding: Union[List[float], np.ndarray], vector_format: str
+) -> Union[List[float], Binary]:
+    """
+    Convert an embedding to the representation stored in MongoDB.
+
+    Args:
+        embedding (Union[List[float], np.ndarray]): Embedding to convert
+        vector_format (str): One of `array`, `float32`, `int8` or `packed_bit`
+
+    Returns:
+        Union[List[float], Binary]: BSON array of doubles, or BSON binary vector
+    """
+    if vector_format == "array":
+        # Local models return NumPy arrays, which BSON cannot encode
+        if isinstance(embedding, np.ndarray):
+            return embedding.tolist()
+        return embedding
+    vector = np.asarray(embedding, dtype=np.float32)
+    if vector_format == "float32":
+        return Binary.from_vector(vector.tolist(), BinaryVectorDtype.FLOAT32)
+    if vector_format == "int8":
+        # Scalar quantization: scale each vector so its largest component maps to +/-127.
+        # This preserves the direction of the vector, so the index should use cosine similarity.
+        scale = np.abs(vector).max()
+        if scale > 0:
+            vector = vector * (127 / scale)
+        return Binary.from_vector(
+            np.rint(vector).astype(np.int8).tolist(), BinaryVectorDtype.INT8
+        )
+    if vector_format == "packed_bit":
+        # Binary quantization: keep the sign of each component, packed 8 dimensions per byte
+        return Binary.from_vector(
+            np.packbits(vector > 0).tolist(),
+            BinaryVectorDtype.PACKED_BIT,
+            padding=-len(vector) % 8,
+        )
+    raise DataError(
+        f"Vector format {vector_format} is not supported. Vector format can only be one of {VECTOR_FORMATS}"
+    )
+
+
+def get_vector_index_definition(
+    provider: str, vector_format: str, path: str = "embeddings"
+) -> Dict:
+    """
+    Get the Atlas Vector Search index definition matching the stored embeddings.
+
+    Args:
+        provider (str): Embeddings provider. One of `openai`, `cohere` or `huggingface`.
+        vector_format (str): One of `array`, `float32`, `int8` or `packed_bit`
+        path (str): Field containing the embeddings
+
+    Returns:
+        Dict: Vector Search index definition
+    """
+    # Atlas only supports euclidean (Hamming) distance for packed bit vectors
+    similarity = "euclidean" if vector_format == "packed_bit" else "cosine"
+    return {
+        "fields": [
+            {
+                "type": "vector",
+                "path": path,
+                "numDimensions": MODEL_INFO[provider][1],
+                "similarity": similarity,
+            }
+        ]
+    }